@@ -1,9 +1,16 @@
 # Use string methods to check if a password has:
 # ≥ 8 characters
 # At least one uppercase and one digit
+#
+# The first version walked the password once per rule with any().
+# PasswordPolicy (password_policy.py) checks all the rules in one pass and can
+# also validate whole batches of passwords.
+
+from password_policy import PasswordPolicy
 
 password = "Password1"
 
-is_valid = len(password) >= 8 and any(c.isupper() for c in password) and any(c.isdigit() for c in password) # any() returns True if at least one element in the iterable is True.
+policy = PasswordPolicy(min_length=8, min_upper=1, min_digits=1, min_special=0)
+is_valid = policy.is_valid(password)
 
 print(is_valid) # True
@@ -1,4 +1,7 @@
 # Use a loop to compute 5! = 5*4*3*2*1
+# (For n in the hundred thousands this loop gets slow: each step multiplies an
+# ever longer number by a short one. 14-functional-programming/fast_factorial.py
+# multiplies numbers of similar size instead.)
 
 num = 5
 factorial = 1
@@ -1,14 +1,18 @@
 # Write a loop to determine if a number is prime.
 
-number = int(input("Enter a number: "))
-is_prime = True
+# The first version (is_prime_trial_division in primes.py, kept for its checks)
+# divided by every i from 2 to number - 1. That is about a million divisions
+# for a number around a million, and it called 0 and 1 prime because the loop
+# never runs for them. is_prime() from primes.py starts with "n < 2 is not
+# prime", divides by the primes up to 41, and decides the rest with a few
+# Miller-Rabin rounds (exact for every 64-bit number). See primes.py for sieves
+# and batch checks.
+
+from primes import is_prime
 
-for i in range(2, number):
-    if number % i == 0:
-        is_prime = False
-        break
+number = int(input("Enter a number: "))
 
-if is_prime:
+if is_prime(number):
     print(f"{number} is a prime number.")
 else:
-    print(f"{number} is not a prime number.")
\ No newline at end of file
+    print(f"{number} is not a prime number.")
@@ -1,18 +1,27 @@
 # Validate passwords using:
 # •	≥ 8 characters
 # •	At least 1 uppercase, 1 digit, and 1 special character.
+#
+# The first version (strength_problem in 04-strings/password_policy.py, kept
+# for the benchmark) walked the password once per rule. PasswordPolicy from
+# 04-strings/password_policy.py checks every rule in one pass and reports them
+# in the same order, so the first failure is the same message as before.
+
+import os
+import sys
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '04-strings'))
+
+from password_policy import PasswordPolicy
+
+policy = PasswordPolicy(min_length=8, min_upper=1, min_digits=1, min_special=1)
 
 while True:
     password = input("Enter a password to check: ")
 
-    if len(password) < 8:
-        print("Password must be at least 8 characters long.")
-    elif not any(char.isupper() for char in password):
-        print("Password must contain at least one uppercase letter.")
-    elif not any(char.isdigit() for char in password):
-        print("Password must contain at least one digit.")
-    elif not any(char in "!@#$%^&*(),.?\":{}|<>" for char in password):
-        print("Password must contain at least one special character.")
+    failed = policy.failures(password)
+    if failed:
+        print(policy.message(failed[0]))
     else:
         print("Password is strong.")
         break
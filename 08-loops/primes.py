@@ -0,0 +1,267 @@
+# Prime numbers for many queries at once.
+#
+# The checker in 02-prime-number-checker.py divides by every i below the
+# number: a million divisions to find out that 1,000,003 is prime. Here:
+#
+#   segmented_sieve(low, high)  sieve of Eratosthenes over [low, high), one
+#                               1 MB bytearray segment at a time, so ranges
+#                               far beyond memory can be scanned
+#   primes_between(low, high)   the primes in a range, as a list
+#   is_prime(n)                 Miller-Rabin: exact for all 64-bit numbers with
+#                               a known set of 7 bases, and for n below 3.3e24
+#                               with the first 13 primes as bases; above that
+#                               it is a probable-prime test
+#   is_prime_batch(numbers)     flags for a whole list/array of numbers: looked
+#                               up in a sieve table when one fits, Miller-Rabin
+#                               otherwise
+#   PrimeTable                  a precomputed sieve (one byte per number, 1 for
+#                               primes) written to a file once and opened with
+#                               mmap, so it loads instantly and the OS only
+#                               reads the pages that are used
+#
+# Usage:
+#   python primes.py check                 compare with trial division and known values
+#   python primes.py benchmark
+#   python primes.py build primes.bin 100000000
+
+import argparse
+import math
+import mmap
+import os
+import random
+import time
+from array import array
+from itertools import compress
+
+SEGMENT_SIZE = 1024 * 1024  # Numbers per segment: the segment stays in the CPU cache
+SMALL_PRIMES = (2, 3, 5, 7, 11, 13, 17, 19, 23, 29, 31, 37, 41)
+BASES_64 = (2, 325, 9375, 28178, 450775, 9780504, 1795265022)  # No composite below 2**64 passes all of them
+AUTO_SIEVE_LIMIT = 100_000_000  # is_prime_batch sieves up to at most this many bytes by itself
+
+
+# Flags for [0, limit]: flags[n] is 1 if n is prime. For small limits only.
+def simple_sieve(limit):
+    flags = bytearray([1]) * (limit + 1)
+    flags[:2] = b"\0\0"[:limit + 1]
+    for p in range(2, math.isqrt(limit) + 1):
+        if flags[p]:
+            flags[p * p::p] = bytes(len(range(p * p, limit + 1, p)))
+    return flags
+
+
+# (start, flags) for consecutive segments covering [low, high):
+# flags[i] is 1 if start + i is prime
+def segmented_sieve(low, high, segment_size=SEGMENT_SIZE):
+    low = max(low, 0)
+    if high <= low:
+        return
+    base = list(compress(range(math.isqrt(high - 1) + 1), simple_sieve(math.isqrt(high - 1))))
+    for start in range(low, high, segment_size):
+        end = min(start + segment_size, high)
+        flags = bytearray([1]) * (end - start)
+        for p in base:
+            square = p * p
+            if square >= end:
+                break
+            first = max(square, (start + p - 1) // p * p)
+            flags[first - start::p] = bytes(len(range(first, end, p)))
+        for n in range(start, min(2, end)):
+            flags[n - start] = 0  # 0 and 1
+        yield start, flags
+
+
+def primes_between(low, high):
+    primes = []
+    for start, flags in segmented_sieve(low, high):
+        primes.extend(compress(range(start, start + len(flags)), flags))
+    return primes
+
+
+def is_prime(n):
+    if n < 2:
+        return False
+    for p in SMALL_PRIMES:
+        if n % p == 0:
+            return n == p
+    if n < 43 * 43:
+        return True  # No factor up to its square root
+    # n - 1 = d * 2**s with d odd
+    d = n - 1
+    s = (d & -d).bit_length() - 1
+    d >>= s
+    for a in BASES_64 if n < 1 << 64 else SMALL_PRIMES:
+        a %= n
+        if a == 0:
+            continue
+        x = pow(a, d, n)
+        if x == 1 or x == n - 1:
+            continue
+        for _ in range(s - 1):
+            x = x * x % n
+            if x == n - 1:
+                break
+        else:
+            return False  # a proves n composite
+    return True
+
+
+class PrimeTable:
+    # flags: bytearray, bytes or mmap with flags[n] == 1 for primes up to `limit`
+    def __init__(self, flags):
+        self.flags = flags
+        self.limit = len(flags) - 1
+
+    @classmethod
+    def build(cls, limit):
+        flags = bytearray()
+        for _, segment in segmented_sieve(0, limit + 1):
+            flags += segment
+        return cls(flags)
+
+    # Map a file written by write_table; nothing is read until it is used
+    @classmethod
+    def load(cls, path):
+        with open(path, "rb") as file:
+            return cls(mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ))
+
+    def close(self):
+        if isinstance(self.flags, mmap.mmap):
+            self.flags.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def is_prime(self, n):
+        if 0 <= n <= self.limit:
+            return self.flags[n] == 1
+        return is_prime(n)
+
+    def primes_between(self, low, high):
+        low, end = max(low, 0), min(high, self.limit + 1)
+        primes = list(compress(range(low, end), self.flags[low:end])) if low < end else []
+        if high > self.limit + 1:
+            primes.extend(primes_between(max(low, self.limit + 1), high))
+        return primes
+
+
+# Sieve [0, limit] straight into a file, one segment at a time. Written to a
+# temporary file first, so an interrupted build never leaves a short table.
+def write_table(path, limit):
+    temp_path = path + ".tmp"
+    with open(temp_path, "wb") as file:
+        for _, flags in segmented_sieve(0, limit + 1):
+            file.write(flags)
+    os.replace(temp_path, path)
+
+
+# 1 (prime) or 0 for every number, in order
+def is_prime_batch(numbers, table=None):
+    if not isinstance(numbers, (list, tuple, array, range)):
+        numbers = list(numbers)
+    if not numbers:
+        return bytearray()
+    low, high = min(numbers), max(numbers)
+    if table is None and low >= 0 and high <= min(AUTO_SIEVE_LIMIT, 1000 * len(numbers)):
+        # Sieving up to the largest number is cheaper than testing each one
+        table = PrimeTable.build(high)
+    if table is not None and low >= 0 and high <= table.limit:
+        return bytearray(map(table.flags.__getitem__, numbers))  # Table lookups in C
+    if table is not None:
+        return bytearray(map(table.is_prime, numbers))
+    return bytearray(map(is_prime, numbers))
+
+
+# The original trial division, with 0 and 1 handled
+def is_prime_trial_division(number):
+    if number < 2:
+        return False
+    for i in range(2, number):
+        if number % i == 0:
+            return False
+    return True
+
+
+def check():
+    limit = 20_000
+    expected = [n for n in range(limit) if is_prime_trial_division(n)]
+    assert [n for n in range(limit) if is_prime(n)] == expected
+    assert primes_between(0, limit) == expected
+    assert primes_between(1_000, 1_100) == [n for n in expected if 1_000 <= n < 1_100]
+    assert sum(len(list(compress(range(start, start + len(flags)), flags)))
+               for start, flags in segmented_sieve(0, limit, segment_size=777)) == len(expected)
+    assert list(is_prime_batch(range(limit))) == [int(n in set(expected)) for n in range(limit)]
+    assert list(is_prime_batch([-7, 0, 1, 2, 10 ** 18 + 9])) == [0, 0, 0, 1, 1]
+    assert len(primes_between(0, 10 ** 7)) == 664_579  # pi(10**7)
+    # Composites that fool weaker tests: Carmichael numbers and strong
+    # pseudoprimes to the first 1, 2, ... 12 primes
+    for n in (561, 2047, 1_373_653, 25_326_001, 3_215_031_751, 2_152_302_898_747,
+              3_474_749_660_383, 341_550_071_728_321, 3_825_123_056_546_413_051,
+              318_665_857_834_031_151_167_461):
+        assert not is_prime(n), n
+    for n in (2 ** 61 - 1, 2 ** 64 - 59, 10 ** 18 + 3, 10 ** 18 + 9):
+        assert is_prime(n), n
+    assert not is_prime(2 ** 64 - 57)
+    # A saved table gives the same answers as the sieve it came from
+    path = f"primes-check-{os.getpid()}.bin"
+    try:
+        write_table(path, 100_000)
+        with PrimeTable.load(path) as table:
+            assert table.primes_between(0, 100_000) == primes_between(0, 100_000)
+            assert table.primes_between(99_000, 101_000) == primes_between(99_000, 101_000)
+            assert table.is_prime(99_991) and not table.is_prime(100_001) and table.is_prime(1_000_003)
+    finally:
+        os.remove(path)
+    print("all checks passed")
+
+
+def rate(count, function, *args):
+    start = time.perf_counter()
+    function(*args)
+    return count / (time.perf_counter() - start)
+
+
+def benchmark():
+    rng = random.Random(0)
+    small = [rng.randrange(100_000) for _ in range(2_000)]
+    print(f"{'trial division, n < 100,000':>34}: {rate(len(small), lambda: [is_prime_trial_division(n) for n in small]):>14,.0f} queries/s")
+    print(f"{'Miller-Rabin, n < 100,000':>34}: {rate(len(small), lambda: [is_prime(n) for n in small]):>14,.0f} queries/s")
+    big = [rng.randrange(2 ** 63, 2 ** 64) | 1 for _ in range(100_000)]
+    print(f"{'Miller-Rabin, odd 64-bit n':>34}: {rate(len(big), is_prime_batch, big):>14,.0f} queries/s")
+
+    limit = 100_000_000
+    start = time.perf_counter()
+    count = sum(sum(flags) for _, flags in segmented_sieve(0, limit))
+    print(f"{'segmented sieve to 10**8':>34}: {time.perf_counter() - start:.2f}s ({count:,} primes)")
+
+    path = f"primes-benchmark-{os.getpid()}.bin"
+    try:
+        start = time.perf_counter()
+        write_table(path, limit)
+        print(f"{'build table file to 10**8':>34}: {time.perf_counter() - start:.2f}s")
+        start = time.perf_counter()
+        with PrimeTable.load(path) as table:
+            print(f"{'load table with mmap':>34}: {time.perf_counter() - start:.6f}s")
+            queries = array("q", (rng.randrange(limit) for _ in range(1_000_000)))
+            print(f"{'batch lookups in table':>34}: {rate(len(queries), is_prime_batch, queries, table):>14,.0f} queries/s")
+            print(f"{'single lookups in table':>34}: {rate(len(queries), lambda: [table.is_prime(n) for n in queries]):>14,.0f} queries/s")
+    finally:
+        os.remove(path)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Prime sieve and primality tests.")
+    parser.add_argument("command", choices=("check", "benchmark", "build"))
+    parser.add_argument("path", nargs="?", default="primes.bin", help="table file for build")
+    parser.add_argument("limit", nargs="?", type=int, default=100_000_000, help="largest number in the table")
+    args = parser.parse_args()
+
+    if args.command == "check":
+        check()
+    elif args.command == "benchmark":
+        benchmark()
+    else:
+        write_table(args.path, args.limit)
+        print(f"Wrote primes up to {args.limit:,} to {args.path}")
@@ -1,8 +1,183 @@
 # Combine file1.txt and file2.txt into merged.txt
 
-with open('file1.txt', 'r') as file1, open('file2.txt', 'r') as file2:
-    content1 = file1.read()
-    content2 = file2.read()
+# The simple version (merge_in_memory, kept for the benchmark) reads both
+# files into memory and joins them. For multi-GB files that needs about three
+# times the input size in RAM (both contents plus the joined string). The
+# version below merges any number of files and streams them into the output
+# instead: os.sendfile copies the bytes inside the kernel without passing them
+# through Python at all, and where that isn't available shutil.copyfileobj
+# copies in 1 MB pieces. Memory use stays the same no matter how big the files
+# are.
+#
+# With --sorted the inputs must each be sorted already, and their lines are
+# merged into one sorted output (a k-way merge with heapq.merge, which only
+# keeps the current line of every input in memory). --key-field picks the
+# column to sort on, e.g. a timestamp.
+#
+# Usage:
+#   python 01-merge-two-files.py [-o merged.txt] [file1.txt file2.txt ...]
+#   python 01-merge-two-files.py --sorted [--key-field N] [--delimiter ,] [--numeric] ...
+#   python 01-merge-two-files.py --benchmark [megabytes]
 
-with open('merged.txt', 'w') as merged:
-    merged.write(content1 + "\n" + content2)
+import argparse
+import heapq
+import os
+import random
+import shutil
+import stat
+import tempfile
+import time
+import tracemalloc
+from contextlib import ExitStack
+
+BUFFER_SIZE = 1024 * 1024  # 1 MB
+SORTED_MERGE_MEMORY = 64 * 1024 * 1024  # Read buffers shared by all inputs of a sorted merge
+
+
+# Append the whole of `source` to the unbuffered file `destination`
+def copy_into(source, destination):
+    info = os.fstat(source.fileno())
+    # Pipes and terminals go through copyfileobj. /proc files are "regular" but
+    # report a size of 0, so st_size is only a hint: copy until sendfile
+    # reaches the end of the file.
+    if hasattr(os, "sendfile") and stat.S_ISREG(info.st_mode):
+        offset = 0
+        try:
+            while True:
+                count = max(info.st_size - offset, BUFFER_SIZE)
+                sent = os.sendfile(destination.fileno(), source.fileno(), offset, count)
+                if sent == 0:
+                    break
+                offset += sent
+            return
+        except OSError:
+            source.seek(offset)  # Not supported for these files: copy the rest in Python
+    shutil.copyfileobj(source, destination, BUFFER_SIZE)
+
+
+# Write the inputs one after another into `output`, with `separator` between them
+def merge_files(inputs, output, separator=b"\n"):
+    # All inputs are opened before the output, so a missing one fails before
+    # merged.txt is touched
+    with ExitStack() as stack:
+        sources = [stack.enter_context(open(path, "rb")) for path in inputs]
+        # Unbuffered, so the separators and the sendfile copies land in order
+        with open(output, "wb", buffering=0) as merged:
+            for i, source in enumerate(sources):
+                if i:
+                    merged.write(separator)
+                copy_into(source, merged)
+
+
+# Lines of an open file, each ending with a newline (also the last one)
+def read_lines(file):
+    for line in file:
+        yield line if line.endswith(b"\n") else line + b"\n"
+
+
+# Key function that sorts lines on one field, e.g. make_key(0, b",", numeric=True)
+def make_key(field, delimiter=None, numeric=False):
+    def key(line):
+        parts = line.split(delimiter, field + 1)
+        value = parts[field].strip() if field < len(parts) else b""
+        if numeric:
+            try:
+                return float(value)
+            except ValueError:
+                return float("-inf")
+        return value
+    return key
+
+
+# Merge files that are each sorted into one sorted file
+def merge_sorted_files(inputs, output, key=None):
+    # Split a fixed memory budget between the inputs, so hundreds of inputs
+    # don't each get a full-size buffer
+    buffer_size = max(64 * 1024, min(BUFFER_SIZE, SORTED_MERGE_MEMORY // max(len(inputs), 1)))
+    with ExitStack() as stack:
+        sources = [stack.enter_context(open(path, "rb", buffering=buffer_size)) for path in inputs]
+        with open(output, "wb", buffering=BUFFER_SIZE) as merged:
+            merged.writelines(heapq.merge(*map(read_lines, sources), key=key))
+
+
+# The original read-everything version
+def merge_in_memory(inputs, output):
+    contents = []
+    for path in inputs:
+        with open(path, "r") as file:
+            contents.append(file.read())
+    with open(output, "w") as merged:
+        merged.write("\n".join(contents))
+
+
+def benchmark(megabytes=200):
+    with tempfile.TemporaryDirectory() as folder:
+        inputs = []
+        line = "x" * 99 + "\n"
+        for name in ("file1.txt", "file2.txt"):
+            path = os.path.join(folder, name)
+            with open(path, "w") as file:
+                for _ in range(megabytes * 10_000 // 2):
+                    file.write(line)
+            inputs.append(path)
+
+        outputs = []
+        for name, merge in (("read into memory", merge_in_memory), ("streaming", merge_files)):
+            output = os.path.join(folder, name + ".txt")
+            tracemalloc.start()
+            start = time.perf_counter()
+            merge(inputs, output)
+            elapsed = time.perf_counter() - start
+            _, peak = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+            outputs.append(output)
+            print(f"{name:>16}: {elapsed:.2f}s, peak Python memory {peak / 1e6:.1f} MB")
+
+        with open(outputs[0], "rb") as first, open(outputs[1], "rb") as second:
+            assert first.read() == second.read()
+
+        # Sorted merge: the same number of lines spread over more and more inputs
+        total_lines = megabytes * 10_000
+        for count in (2, 16, 128, 512):
+            rng = random.Random(count)
+            inputs = []
+            for i in range(count):
+                path = os.path.join(folder, f"sorted-{i}.txt")
+                numbers = sorted(rng.randrange(10 ** 12) for _ in range(total_lines // count))
+                with open(path, "w") as file:
+                    file.writelines(f"{number:012d},event {number % 97}\n" for number in numbers)
+                inputs.append(path)
+            output = os.path.join(folder, "sorted-merged.txt")
+            start = time.perf_counter()
+            merge_sorted_files(inputs, output, make_key(0, b","))
+            elapsed = time.perf_counter() - start
+            with open(output, "rb") as merged:
+                lines = merged.readlines()
+            assert lines == sorted(lines)
+            print(f"sorted merge of {count:>3} inputs: {len(lines) / elapsed:,.0f} lines/s")
+            for path in inputs:
+                os.remove(path)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Merge files into one.")
+    parser.add_argument("inputs", nargs="*", default=["file1.txt", "file2.txt"])
+    parser.add_argument("-o", "--output", default="merged.txt")
+    parser.add_argument("--sorted", action="store_true", help="k-way merge of already sorted inputs")
+    parser.add_argument("--key-field", type=int, help="sort on this field (0 = first) instead of the whole line")
+    parser.add_argument("--delimiter", help="field delimiter for --key-field (default: whitespace)")
+    parser.add_argument("--numeric", action="store_true", help="compare the key field as a number")
+    parser.add_argument("--benchmark", type=int, nargs="?", const=200, metavar="MEGABYTES",
+                        help="compare with reading the files into memory")
+    args = parser.parse_args()
+
+    if args.benchmark:
+        benchmark(args.benchmark)
+    elif args.sorted:
+        key = None
+        if args.key_field is not None:
+            delimiter = args.delimiter.encode() if args.delimiter else None
+            key = make_key(args.key_field, delimiter, args.numeric)
+        merge_sorted_files(args.inputs, args.output, key)
+    else:
+        merge_files(args.inputs, args.output)
@@ -1,10 +1,310 @@
 # Count ERROR entries in a log file named 'logfile.txt'
 
-error_count = 0
+# The simple version (count_errors_line_by_line, kept for the benchmark) reads
+# the file line by line as text and checks each line. That is fine for small
+# files, but for multi-GB logs it decodes every byte and runs one Python-level
+# check per line (and one more per extra pattern). The version below reads the
+# file once, in binary chunks small enough to stay in the CPU cache, and counts
+# every pattern in each chunk with a precompiled regex `PATTERN[^\n]*`. The
+# regex searches for the pattern in C and then swallows the rest of the line,
+# so like the simple loop each line is counted at most once per pattern. With
+# --histogram it also records the minute from the timestamp at the start of
+# every matching line.
+#
+# With --workers N the file is split into newline-aligned byte ranges that a
+# pool of processes scans in parallel, each worker mmap'ing only its own
+# range. The partial counts are added up at the end, giving exactly the same
+# result as the sequential scan.
+#
+# With --incremental the totals and the byte offset reached are saved in a
+# state file, and the next run only reads what was appended since. --follow
+# does that every few seconds. If the log is rotated (new inode) or truncated
+# (smaller than the saved offset) counting restarts at the beginning of the
+# new file, and the running totals carry on.
+#
+# Usage:
+#   python 02-log-analyzer.py [logfile.txt] [--patterns ERROR WARNING ...] [--histogram]
+#                             [--workers N] [--incremental | --follow [--interval S]]
+#   python 02-log-analyzer.py logfile.txt --benchmark [--workers N]
 
-with open('logfile.txt', 'r') as log_file:
-    for line in log_file:
-        if "ERROR" in line:
-            error_count += 1
+import argparse
+import json
+import mmap
+import multiprocessing
+import os
+import re
+import time
+from collections import Counter
 
-print("Total ERROR entries:", error_count)
+CHUNK_SIZE = 1024 * 1024  # 1 MB per read, so every pattern scans it while it is still in cache
+LEVELS = ["CRITICAL", "ERROR", "WARNING", "INFO", "DEBUG"]
+# Lines are expected to start with a timestamp like "2024-05-01 12:34:56"
+MINUTE = re.compile(rb"\d{4}-\d{2}-\d{2}[ T]\d{2}:\d{2}")
+
+
+# One compiled matcher per pattern: the pattern and the rest of its line. The
+# empty group at the end makes findall() return b"" for every match instead of
+# copying the rest of each line.
+def compile_patterns(patterns):
+    return [(pattern.encode(), re.compile(re.escape(pattern.encode()) + rb"[^\n]*()"))
+            for pattern in patterns]
+
+
+# Count the matching lines in data[start:end], which holds complete lines
+def scan_block(data, matchers, counts, histogram=None, start=0, end=None):
+    end = len(data) if end is None else end
+    for pattern, matcher in matchers:
+        if histogram is None:
+            counts[pattern] += len(matcher.findall(data, start, end))
+            continue
+        for match in matcher.finditer(data, start, end):
+            counts[pattern] += 1
+            line_start = data.rfind(b"\n", start, match.start()) + 1 or start
+            minute = MINUTE.match(data, line_start)
+            if minute:
+                histogram[bytes(minute.group()), pattern] += 1
+
+
+# Returns {pattern: lines} and, with histogram=True, {minute: {pattern: lines}}
+def analyze(path, patterns=LEVELS, histogram=False, chunk_size=CHUNK_SIZE):
+    matchers = compile_patterns(patterns)
+    counts = Counter()
+    minutes = Counter() if histogram else None  # (minute, pattern) -> lines
+    # One buffer reused for every read, and the regexes scan it in place
+    # (start/end positions instead of slicing), so no chunk is ever copied
+    buffer = bytearray(chunk_size)
+    leftover = b""  # Partial line at the end of the previous chunk
+    with open(path, "rb") as log_file:
+        while size := log_file.readinto(buffer):
+            start = 0
+            if leftover:
+                first = buffer.find(b"\n", 0, size) + 1
+                if first == 0:
+                    leftover += buffer[:size]
+                    continue
+                scan_block(leftover + buffer[:first], matchers, counts, minutes)
+                start = first
+            end = buffer.rfind(b"\n", start, size) + 1 or start
+            scan_block(buffer, matchers, counts, minutes, start, end)
+            leftover = bytes(buffer[end:size])
+        if leftover:
+            scan_block(leftover, matchers, counts, minutes)
+    return decode_results(counts, minutes)
+
+
+# Split the file into about `parts` byte ranges that start and end on line
+# boundaries
+def split_ranges(path, parts):
+    size = os.path.getsize(path)
+    boundaries = [0]
+    with open(path, "rb") as log_file:
+        for i in range(1, parts):
+            log_file.seek(max(size * i // parts, boundaries[-1]))
+            log_file.readline()  # Move to the start of the next line
+            position = log_file.tell()
+            if position >= size:
+                break
+            if position > boundaries[-1]:
+                boundaries.append(position)
+    boundaries.append(size)
+    return list(zip(boundaries, boundaries[1:]))
+
+
+# Worker: scan one byte range through its own memory map
+def analyze_range(task):
+    path, start, end, patterns, histogram, chunk_size = task
+    matchers = compile_patterns(patterns)
+    counts = Counter()
+    minutes = Counter() if histogram else None
+    if end <= start:
+        return counts, minutes
+    # A mapping has to start on a multiple of the allocation granularity
+    offset = start - start % mmap.ALLOCATIONGRANULARITY
+    with open(path, "rb") as log_file, \
+            mmap.mmap(log_file.fileno(), end - offset, access=mmap.ACCESS_READ, offset=offset) as data:
+        position = start - offset
+        stop = end - offset
+        while position < stop:
+            # Scan cache-sized blocks that end on a line boundary
+            block_end = min(position + chunk_size, stop)
+            if block_end < stop:
+                newline = data.rfind(b"\n", position, block_end)
+                if newline == -1:  # A line longer than a block: run on to its end
+                    newline = data.find(b"\n", block_end, stop)
+                block_end = newline + 1 if newline != -1 else stop
+            scan_block(data, matchers, counts, minutes, position, block_end)
+            position = block_end
+    return counts, minutes
+
+
+def analyze_parallel(path, patterns=LEVELS, histogram=False, workers=None, chunk_size=CHUNK_SIZE):
+    workers = workers or os.cpu_count()
+    # A few ranges per worker so a slow range doesn't leave the others idle
+    tasks = [(path, start, end, patterns, histogram, chunk_size)
+             for start, end in split_ranges(path, workers * 4)]
+    counts = Counter()
+    minutes = Counter()
+    with multiprocessing.Pool(workers) as pool:
+        for range_counts, range_minutes in pool.imap_unordered(analyze_range, tasks):
+            counts.update(range_counts)
+            if range_minutes:
+                minutes.update(range_minutes)
+    return decode_results(counts, minutes)
+
+
+# Offset just past the last complete line in [start, size)
+def last_line_end(path, start, size, block_size=64 * 1024):
+    with open(path, "rb") as log_file:
+        end = size
+        while end > start:
+            begin = max(start, end - block_size)
+            log_file.seek(begin)
+            newline = log_file.read(end - begin).rfind(b"\n")
+            if newline != -1:
+                return begin + newline + 1
+            end = begin
+    return start
+
+
+def load_state(state_path):
+    try:
+        with open(state_path, "r") as state_file:
+            return json.load(state_file)
+    except FileNotFoundError:
+        return {"inode": None, "offset": 0, "counts": {}, "histogram": {}}
+
+
+# Write `data` to a temporary file and rename it over `path`, so an
+# interrupted save leaves the previous file in place, never a half-written one
+def write_json(path, data):
+    temp_path = path + ".tmp"
+    with open(temp_path, "w") as file:
+        json.dump(data, file)
+    os.replace(temp_path, path)
+
+
+# Count the complete lines in [offset, end of file) and add them to the state
+def count_new_lines(path, state, patterns, histogram):
+    size = os.path.getsize(path)
+    end = last_line_end(path, state["offset"], size)
+    counts, minutes = decode_results(*analyze_range((path, state["offset"], end, patterns,
+                                                     histogram, CHUNK_SIZE)))
+    for pattern, count in counts.items():
+        state["counts"][pattern] = state["counts"].get(pattern, 0) + count
+    for minute, minute_counts in minutes.items():
+        totals = state["histogram"].setdefault(minute, {})
+        for pattern, count in minute_counts.items():
+            totals[pattern] = totals.get(pattern, 0) + count
+    state["offset"] = end
+
+
+# Process only the bytes appended since the last run; cost is proportional to
+# the new data
+def refresh(path, state_path, patterns=LEVELS, histogram=False):
+    state = load_state(state_path)
+    stat = os.stat(path)
+    if state["inode"] is not None and state["inode"] != stat.st_ino:
+        # Rotated: finish the old file first if it was renamed to path.1
+        rotated = path + ".1"
+        if os.path.exists(rotated) and os.stat(rotated).st_ino == state["inode"]:
+            count_new_lines(rotated, state, patterns, histogram)
+        state["offset"] = 0
+    elif stat.st_size < state["offset"]:
+        state["offset"] = 0  # Truncated
+    state["inode"] = stat.st_ino
+    count_new_lines(path, state, patterns, histogram)
+    write_json(state_path, state)
+    return state["counts"], dict(sorted(state["histogram"].items()))
+
+
+def decode_results(counts, histogram):
+    counts = {pattern.decode(): count for pattern, count in counts.items()}
+    by_minute = {}
+    for (minute, pattern), count in sorted((histogram or {}).items()):
+        by_minute.setdefault(minute.decode(), {})[pattern.decode()] = count
+    return counts, by_minute
+
+
+# The original line-by-line loop
+def count_errors_line_by_line(path):
+    error_count = 0
+    with open(path, "r") as log_file:
+        for line in log_file:
+            if "ERROR" in line:
+                error_count += 1
+    return error_count
+
+
+def benchmark(path, patterns, workers=None):
+    size = os.path.getsize(path) / 1e9
+    start = time.perf_counter()
+    expected = count_errors_line_by_line(path)
+    elapsed = time.perf_counter() - start
+    print(f"line by line, ERROR only: {size / elapsed:.3f} GB/s")
+
+    for label, chosen, histogram in (("chunked, ERROR only", ["ERROR"], False),
+                                     (f"chunked, {len(patterns)} patterns", patterns, False),
+                                     (f"chunked, {len(patterns)} patterns + histogram", patterns, True)):
+        start = time.perf_counter()
+        counts, _ = analyze(path, chosen, histogram)
+        elapsed = time.perf_counter() - start
+        print(f"{label}: {size / elapsed:.3f} GB/s")
+        if "ERROR" in chosen:
+            assert counts["ERROR"] == expected
+
+    sequential = analyze(path, patterns, True)
+    workers = workers or os.cpu_count()
+    for count in sorted({workers} | {2 ** i for i in range(workers.bit_length()) if 2 ** i < workers}):
+        start = time.perf_counter()
+        result = analyze_parallel(path, patterns, True, count)
+        elapsed = time.perf_counter() - start
+        print(f"parallel, {count} workers, {len(patterns)} patterns + histogram: {size / elapsed:.3f} GB/s")
+        assert result == sequential
+
+
+# ERROR comes first when it was asked for, as in the original report
+def report_order(patterns):
+    return sorted(patterns, key=lambda pattern: pattern != "ERROR")
+
+
+def print_report(counts, histogram, patterns, show_histogram):
+    for pattern in report_order(patterns):
+        print(f"Total {pattern} entries:", counts.get(pattern, 0))
+    if show_histogram:
+        print("\nPer-minute counts:")
+        for minute, minute_counts in histogram.items():
+            line = ", ".join(f"{pattern}={count}" for pattern, count in minute_counts.items())
+            print(f"{minute}  {line}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Count log levels and patterns in a log file.")
+    parser.add_argument("path", nargs="?", default="logfile.txt")
+    parser.add_argument("--patterns", nargs="+", default=LEVELS)
+    parser.add_argument("--histogram", action="store_true", help="print per-minute counts")
+    parser.add_argument("--benchmark", action="store_true", help="compare with the line-by-line loop")
+    parser.add_argument("--workers", type=int, default=0, help="scan with this many processes")
+    parser.add_argument("--incremental", action="store_true", help="only read what was appended since the last run")
+    parser.add_argument("--follow", action="store_true", help="keep reading new lines as the log grows")
+    parser.add_argument("--interval", type=float, default=5.0, help="seconds between refreshes with --follow")
+    parser.add_argument("--state", help="state file for --incremental/--follow (default: <log>.state)")
+    args = parser.parse_args()
+    state_path = args.state or args.path + ".state"
+
+    if args.follow:
+        while True:
+            counts, histogram = refresh(args.path, state_path, args.patterns, args.histogram)
+            print(time.strftime("[%H:%M:%S]"),
+                  ", ".join(f"{pattern}: {counts.get(pattern, 0)}" for pattern in report_order(args.patterns)))
+            time.sleep(args.interval)
+    elif args.incremental:
+        counts, histogram = refresh(args.path, state_path, args.patterns, args.histogram)
+        print_report(counts, histogram, args.patterns, args.histogram)
+    elif args.benchmark:
+        benchmark(args.path, args.patterns, args.workers)
+    elif args.workers:
+        counts, histogram = analyze_parallel(args.path, args.patterns, args.histogram, args.workers)
+        print_report(counts, histogram, args.patterns, args.histogram)
+    else:
+        counts, histogram = analyze(args.path, args.patterns, args.histogram)
+        print_report(counts, histogram, args.patterns, args.histogram)
@@ -1,12 +1,62 @@
+import argparse
+import random
+import sys
+import time
 from functools import lru_cache
 
+from memoize import memoize
+
 # Use @lru_cache to optimize a recursive factorial function.
+#
+# @lru_cache(maxsize=None) keeps every factorial it has ever computed, and
+# factorials grow fast (1000! alone takes over 1 KB), so the cache grows
+# without bound. memoize() from memoize.py caps it by bytes instead, evicting
+# the least recently used results, and counts hits, misses and evictions.
+#
+# The recursion still goes one call deeper per n and fails at a few hundred;
+# fast_factorial.py computes factorials of big n without recursion.
 
-@lru_cache(maxsize=None)
+@memoize("lru", maxsize=None, maxbytes=16 * 1024 * 1024)
 def factorial(n):
     if n < 2:
         return 1
     return n * factorial(n - 1)
 
-# Example usage
-print(factorial(5))  # Output: 120
\ No newline at end of file
+
+# Random factorials from 0 to 399 with both caches: speed and cache size
+def benchmark(rounds=100_000, maxbytes=64 * 1024):
+    @lru_cache(maxsize=None)
+    def unbounded_factorial(n):
+        if n < 2:
+            return 1
+        return n * unbounded_factorial(n - 1)
+
+    @memoize("lru", maxsize=None, maxbytes=maxbytes)
+    def bounded_factorial(n):
+        if n < 2:
+            return 1
+        return n * bounded_factorial(n - 1)
+
+    rng = random.Random(0)
+    queries = [int(400 * rng.random() ** 2) for _ in range(rounds)]
+    for name, function in (("lru_cache(maxsize=None)", unbounded_factorial),
+                           (f"memoize, {maxbytes // 1024} KB", bounded_factorial)):
+        start = time.perf_counter()
+        for n in queries:
+            function(n)
+        elapsed = time.perf_counter() - start
+        print(f"{name:>24}: {rounds / elapsed:>10,.0f} calls/s  {function.cache_info()}")
+    cached = sum(sys.getsizeof(unbounded_factorial(n)) for n in range(400))
+    print(f"{'':>24}  lru_cache holds {cached:,} bytes of results")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Memoized factorial.")
+    parser.add_argument("--benchmark", action="store_true", help="compare with lru_cache(maxsize=None)")
+    args = parser.parse_args()
+
+    if args.benchmark:
+        benchmark()
+    else:
+        # Example usage
+        print(factorial(5))  # Output: 120
@@ -1,23 +1,341 @@
 # Use multiprocessing.Pool to count words in multiple files.
 
-import os
+# The simple version (count_words_whole_files, kept for the benchmark) gives
+# every worker a whole file and reads it at once. One huge file then lands on
+# a single core, and each worker needs the whole file (plus the list of its
+# words) in memory. The version below is a small map-reduce:
+#
+#   split   every file is cut into byte ranges of at most --chunk-size MB,
+#           and small files are grouped into tasks of about that size
+#   map     a worker streams each range of its task in 1 MB blocks and counts
+#           every word into one Counter per task. A word belongs to the range
+#           it starts in, so a word cut by a range boundary is counted once
+#   reduce  the per-task Counters are merged pairwise as they arrive (a tree
+#           reduction), so merges stay balanced and only about log2(tasks)
+#           Counters are held at any time. The ranges of a file that was cut
+#           up are first merged on their own and only join the total once
+#           all of them arrived without an error
+#
+# Tasks are handed out with imap_unordered, so workers never wait for each
+# other. Range boundaries are moved to the next UTF-8 character boundary, and
+# each range is decoded and split with str.split(), so words are separated by
+# the same (Unicode) whitespace as in the original and the totals match it.
+#
+# With many distinct words, sending the Counters back is the slow part: a
+# pickled Counter is one opcode stream with an object per word and count,
+# and the parent has to rebuild all of them. --aggregate picks how results
+# travel instead:
+#
+#   pickle  the Counter itself (the default)
+#   buffer  two flat buffers: the words joined by newlines, and their counts
+#           as an array of the smallest integer type that holds them (one
+#           byte per word for most tasks). Pickling two bytes objects is a
+#           plain copy, and the parent splits them apart in C
+#   shared  the same two buffers, written into a multiprocessing.shared_memory
+#           block; only its name goes through the pipe. The parent picks the
+#           name of every task's block up front, so if it stops early (an
+#           error, Ctrl-C) it can still unlink the blocks it never read
+#
+# Usage:
+#   python 03-parallel-word-count.py [file ...] [--workers N] [--chunk-size MB] [--top N]
+#                                    [--aggregate pickle|buffer|shared]
+#   python 03-parallel-word-count.py --benchmark [megabytes]
+
+import argparse
+import codecs
 import multiprocessing
+import os
+import pickle
+import random
+import re
+import secrets
+import tempfile
+import time
+from array import array
+from collections import Counter
+from functools import partial
+from multiprocessing import resource_tracker, shared_memory
+
+BLOCK_SIZE = 1024 * 1024  # 1 MB read at a time inside a range
+CHUNK_SIZE = 32 * 1024 * 1024  # Files bigger than this are split into ranges
+WHITESPACE = re.compile(r"\s")  # The same characters that str.split() splits on
+AGGREGATIONS = ("pickle", "buffer", "shared")
+
+
+# Cut the files into tasks: lists of (path, start, end) ranges holding about
+# `chunk_size` bytes each. Files that can't be read are returned separately
+# with their error.
+def split_tasks(file_paths, chunk_size=CHUNK_SIZE):
+    tasks = []
+    errors = {}
+    small = []  # Ranges of small files not in a task yet
+    small_bytes = 0
+    for path in file_paths:
+        try:
+            size = os.path.getsize(path)
+        except OSError as e:
+            errors[path] = f"Error: {e}"
+            continue
+        if size >= chunk_size:
+            tasks.extend([(path, start, min(start + chunk_size, size))]
+                         for start in range(0, size, chunk_size))
+            continue
+        small.append((path, 0, size))
+        small_bytes += size
+        if small_bytes >= chunk_size:
+            tasks.append(small)
+            small, small_bytes = [], 0
+    if small:
+        tasks.append(small)
+    return tasks, errors
+
+
+# Map step: count the words in every range of a task. Returns the result
+# pickled here rather than by the pool, so its size can be reported: in every
+# mode {path: words in its ranges, or the error} plus the counts, encoded as
+# chosen by `aggregate`. `numbered_task` is (task number, task); in shared
+# mode the block is named block_name(prefix, number).
+def count_task(numbered_task, aggregate="pickle", prefix=None):
+    number, task = numbered_task
+    totals = {}
+    counts = Counter()
+    for path, start, end in task:
+        totals[path] = count_range(path, start, end, counts)
+    if aggregate == "pickle":
+        return pickle.dumps((totals, counts), pickle.HIGHEST_PROTOCOL)
+    words, typecode, numbers = encode_counts(counts)
+    if aggregate == "buffer":
+        return pickle.dumps((totals, words, typecode, numbers), pickle.HIGHEST_PROTOCOL)
+    block = shared_memory.SharedMemory(block_name(prefix, number), create=True,
+                                       size=max(1, len(words) + len(numbers)))
+    block.buf[:len(words)] = words
+    block.buf[len(words):len(words) + len(numbers)] = numbers
+    block.close()
+    # The parent unlinks the block after reading it, or in word_count if it
+    # stops before reading it. This worker's resource tracker must not: it
+    # would unlink the block when the worker exits, and warn about a leak.
+    resource_tracker.unregister(block._name, "shared_memory")
+    return pickle.dumps((totals, block.name, len(words), typecode, len(numbers)), pickle.HIGHEST_PROTOCOL)
+
+
+def block_name(prefix, number):
+    return f"{prefix}_{number}"
+
+
+# Unlink the shared memory blocks of tasks whose results were never read
+def unlink_blocks(prefix, count):
+    for number in range(count):
+        try:
+            block = shared_memory.SharedMemory(block_name(prefix, number))
+        except FileNotFoundError:
+            continue  # Already read, or never created
+        block.close()
+        block.unlink()
+
+
+# Counter -> (words joined by newlines as UTF-8, array typecode, counts as that type)
+def encode_counts(counts):
+    largest = max(counts.values(), default=0)
+    typecode = next(code for code in "BHIQ" if largest < 1 << 8 * array(code).itemsize)
+    return "\n".join(counts).encode(), typecode, array(typecode, counts.values()).tobytes()
+
+
+def decode_counts(words, typecode, numbers):
+    if not words:
+        return Counter()
+    counts = array(typecode)
+    counts.frombytes(numbers)
+    result = Counter()
+    dict.update(result, zip(words.decode().split("\n"), counts))  # Plain dict update: the words are unique
+    return result
+
+
+# Parent side of count_task: (totals, Counter) from the pickled result.
+# `stats` collects the bytes that came through the pipe and shared memory.
+def receive_task(payload, aggregate, stats):
+    stats["ipc_bytes"] += len(payload)
+    result = pickle.loads(payload)
+    if aggregate == "pickle":
+        return result
+    if aggregate == "buffer":
+        totals, words, typecode, numbers = result
+        return totals, decode_counts(words, typecode, numbers)
+    totals, name, words_size, typecode, numbers_size = result
+    block = shared_memory.SharedMemory(name=name)
+    try:
+        words = bytes(block.buf[:words_size])
+        numbers = bytes(block.buf[words_size:words_size + numbers_size])
+    finally:
+        block.close()
+        block.unlink()
+    stats["shared_bytes"] += words_size + numbers_size
+    return totals, decode_counts(words, typecode, numbers)
+
+
+# First offset at or after `position` that starts a UTF-8 character
+def character_boundary(file, position):
+    if position == 0:
+        return 0
+    file.seek(position)
+    lead = file.read(4)
+    # Continuation bytes look like 0b10xxxxxx
+    offset = next((i for i, byte in enumerate(lead) if byte & 0xC0 != 0x80), len(lead))
+    return position + offset
+
+
+# True if the character just before `position` (a character boundary) is whitespace
+def follows_whitespace(file, position):
+    if position == 0:
+        return True
+    file.seek(max(0, position - 4))
+    before = file.read(position - file.tell())
+    return before.decode("utf-8", "replace")[-1:].isspace()
+
+
+# Count the words that start in file[start:end] into `counts`. A range
+# covers the characters whose first byte lies in it, so neighbouring ranges
+# split a file at the same character boundaries.
+def count_range(path, start, end, counts):
+    total = 0
+    found = Counter()
+    try:
+        with open(path, "rb") as file:
+            position = character_boundary(file, start)
+            skip = not follows_whitespace(file, position)  # Word started in the previous range
+            file.seek(position)
+            decoder = codecs.getincrementaldecoder("utf-8")()
+            carry = ""  # Unfinished word at the end of the last block
+            while position < end:
+                block = file.read(min(BLOCK_SIZE, end - position))
+                if not block:
+                    break
+                position += len(block)
+                text = decoder.decode(block)
+                if skip:
+                    space = WHITESPACE.search(text)
+                    if space is None:
+                        continue
+                    text = text[space.start():]
+                    skip = False
+                if not text:
+                    continue  # Only part of a character so far
+                words = (carry + text).split() if carry else text.split()
+                carry = words.pop() if words and not text[-1].isspace() else ""
+                found.update(words)
+                total += len(words)
+
+            # The last word, or a character cut by `end`, may run on past
+            # `end`: read until the word finishes
+            while not skip and (carry or decoder.getstate()[0]):
+                block = file.read(64 * 1024)
+                text = decoder.decode(block, final=not block)
+                space = WHITESPACE.search(text)
+                carry += text[:space.start()] if space else text
+                if space or not block:
+                    if carry:
+                        found[carry] += 1
+                        total += 1
+                    break
+    except (OSError, UnicodeDecodeError) as e:
+        return f"Error: {e}"
+    counts.update(found)
+    return total
 
-# Create sample text files for testing
-sample_files = {
-    "file1.txt": "Hello world! This is file 1 with some text.",
-    "file2.txt": "This is file 2. It contains more words than file 1.",
-    "file3.txt": "File 3 has the most words among all files for testing."
-}
 
-for filename, content in sample_files.items():
-    with open(filename, "w", encoding="utf-8") as f:
-        f.write(content)
+# Add the smaller Counter into the bigger one
+def merge_counts(first, second):
+    if len(first) < len(second):
+        first, second = second, first
+    first.update(second)
+    return first
 
-print("Sample files created successfully.")
 
+# Reduce step: merge Counters pairwise as they arrive, like adding 1 to a
+# binary number. Two Counters of the same level become one of the next level.
+def tree_reduce(counters):
+    stack = []  # (level, counter)
+    for counter in counters:
+        level = 0
+        while stack and stack[-1][0] == level:
+            counter = merge_counts(stack.pop()[1], counter)
+            level += 1
+        stack.append((level, counter))
+    result = Counter()
+    while stack:
+        result = merge_counts(stack.pop()[1], result)
+    return result
 
-# Function to count words in a single file
+
+# Count words in all the files. Returns ({path: total words or error}, Counter
+# of every word over the files that were read without an error). Pass a dict as `stats` to get the number of
+# result bytes sent through the pipe ("ipc_bytes") and shared memory
+# ("shared_bytes").
+def word_count(file_paths, workers=None, chunk_size=CHUNK_SIZE, aggregate="pickle", stats=None):
+    workers = workers or os.cpu_count()
+    stats = {} if stats is None else stats
+    stats.update(ipc_bytes=0, shared_bytes=0)
+    tasks, totals = split_tasks(file_paths, chunk_size)
+    # Send tasks in batches when there are many, but keep at least four
+    # batches per worker so one slow batch doesn't leave the others idle
+    batch = max(1, len(tasks) // (workers * 4))
+
+    # Files cut into several ranges (a small file is one range that starts
+    # at 0 and is shorter than chunk_size), with the number of their ranges
+    # still to arrive. Their counts are held back until every range is in,
+    # and dropped if any range failed, so a file with an error adds no words
+    # whatever the chunk size.
+    ranges = Counter(path for task in tasks for path, start, end in task
+                     if start or end - start >= chunk_size)
+    parts = {path: count for path, count in ranges.items() if count > 1}
+    pending = {}  # path -> Counter of its ranges received so far
+
+    def counters(results):
+        for payload in results:
+            task_totals, counts = receive_task(payload, aggregate, stats)
+            for path, total in task_totals.items():
+                if isinstance(total, str):
+                    totals[path] = total
+                elif not isinstance(totals.get(path), str):
+                    totals[path] = totals.get(path, 0) + total
+            # A range of a split file is always a task of its own
+            path = next(iter(task_totals)) if len(task_totals) == 1 else None
+            if path in parts:
+                parts[path] -= 1
+                if isinstance(totals[path], str):
+                    pending.pop(path, None)
+                else:
+                    pending[path] = merge_counts(pending.pop(path, Counter()), counts)
+                if parts[path]:
+                    continue
+                del parts[path]
+                counts = pending.pop(path, None)
+                if counts is None:
+                    continue
+            yield counts
+
+    # Unique per call, so concurrent calls never share block names
+    prefix = f"wc_{os.getpid()}_{secrets.token_hex(4)}"
+    try:
+        # Leaving the with block terminates the workers, so none of them can
+        # create a block after the cleanup below
+        with multiprocessing.Pool(workers) as pool:
+            count = partial(count_task, aggregate=aggregate, prefix=prefix)
+            numbered = enumerate(tasks)
+            frequencies = tree_reduce(counters(pool.imap_unordered(count, numbered, chunksize=batch)))
+    except BaseException:
+        if aggregate == "shared":
+            unlink_blocks(prefix, len(tasks))
+        raise
+    return totals, frequencies
+
+
+# Function to process multiple files using multiprocessing
+def count_words_in_multiple_files(file_paths, workers=None):
+    totals, _ = word_count(file_paths, workers)
+    return [(path, totals[path]) for path in file_paths]
+
+
+# The original whole-file version
 def count_words_in_file(file_path):
     try:
         with open(file_path, 'r', encoding='utf-8') as file:
@@ -27,19 +345,127 @@ def count_words_in_file(file_path):
     except Exception as e:
         return file_path, f"Error: {e}"
 
-# Function to process multiple files using multiprocessing
-def count_words_in_multiple_files(file_paths):
+
+def count_words_whole_files(file_paths):
     with multiprocessing.Pool(processes=os.cpu_count()) as pool:
         results = pool.map(count_words_in_file, file_paths)
     return results
 
+
+# The same, extended to word frequencies: one Counter per whole file
+def count_frequencies_in_file(file_path):
+    with open(file_path, 'r', encoding='utf-8') as file:
+        return Counter(file.read().split())
+
+
+# pool.map would pickle the Counters itself; doing it explicitly (the same
+# work) lets the benchmark count the bytes
+def pickled_frequencies_in_file(file_path):
+    return pickle.dumps(count_frequencies_in_file(file_path), pickle.HIGHEST_PROTOCOL)
+
+
+def count_frequencies_whole_files(file_paths, stats=None):
+    stats = {} if stats is None else stats
+    stats["ipc_bytes"] = 0
+    frequencies = Counter()
+    with multiprocessing.Pool(processes=os.cpu_count()) as pool:
+        for payload in pool.map(pickled_frequencies_in_file, file_paths):
+            stats["ipc_bytes"] += len(payload)
+            frequencies.update(pickle.loads(payload))
+    return frequencies
+
+
+def create_sample_files():
+    sample_files = {
+        "file1.txt": "Hello world! This is file 1 with some text.",
+        "file2.txt": "This is file 2. It contains more words than file 1.",
+        "file3.txt": "File 3 has the most words among all files for testing."
+    }
+    for filename, content in sample_files.items():
+        with open(filename, "w", encoding="utf-8") as f:
+            f.write(content)
+    print("Sample files created successfully.")
+    return list(sample_files)
+
+
+# One big file and many small ones, counted both ways
+def benchmark(megabytes=200, workers=None):
+    rng = random.Random(0)
+    vocabulary = [f"word{i}" for i in range(50_000)]
+    with tempfile.TemporaryDirectory() as folder:
+        big = os.path.join(folder, "big.txt")
+        with open(big, "w") as file:
+            line_count = megabytes * 1024 * 1024 // 100
+            for _ in range(line_count // 1000):
+                file.write("".join(" ".join(rng.choices(vocabulary, k=12)) + "\n" for _ in range(1000)))
+        small = []
+        for i in range(2000):
+            path = os.path.join(folder, f"small-{i}.txt")
+            with open(path, "w") as file:
+                file.write(" ".join(rng.choices(vocabulary, k=200)))
+            small.append(path)
+
+        for name, paths in ((f"one {megabytes} MB file", [big]), ("2000 small files", small)):
+            start = time.perf_counter()
+            expected = count_words_whole_files(paths)
+            whole = time.perf_counter() - start
+            start = time.perf_counter()
+            expected_frequencies = count_frequencies_whole_files(paths)
+            whole_frequencies = time.perf_counter() - start
+            start = time.perf_counter()
+            totals, frequencies = word_count(paths, workers)
+            split = time.perf_counter() - start
+            assert [(path, totals[path]) for path in paths] == expected
+            assert frequencies == expected_frequencies
+            print(f"{name}: whole files {whole:.2f}s (totals only), "
+                  f"{whole_frequencies:.2f}s (frequencies); map-reduce {split:.2f}s")
+
+        # Result transfer: many tasks, each with a large vocabulary
+        vocabulary = [f"term{i}" for i in range(1_000_000)]
+        wide = os.path.join(folder, "wide.txt")
+        with open(wide, "w") as file:
+            for _ in range(megabytes * 1024 * 1024 // 12 // 10_000):
+                file.write(" ".join(rng.choices(vocabulary, k=10_000)) + "\n")
+        chunk_size = 4 * 1024 * 1024
+        print(f"\nresults of {os.path.getsize(wide) // chunk_size} tasks of 4 MB, 1M distinct words:")
+        stats = {}
+        start = time.perf_counter()
+        expected = count_frequencies_whole_files([wide], stats)
+        elapsed = time.perf_counter() - start
+        print(f"{'pool.map, whole file':>22}: {elapsed:6.2f}s, {stats['ipc_bytes'] / 1e6:8.1f} MB through the pipe")
+        for aggregate in AGGREGATIONS:
+            start = time.perf_counter()
+            _, frequencies = word_count([wide], workers, chunk_size, aggregate, stats)
+            elapsed = time.perf_counter() - start
+            assert frequencies == expected
+            print(f"{'map-reduce, ' + aggregate:>22}: {elapsed:6.2f}s, {stats['ipc_bytes'] / 1e6:8.1f} MB through the pipe, "
+                  f"{stats['shared_bytes'] / 1e6:.1f} MB shared memory")
+
+
 if __name__ == "__main__":
-    # List of text files
-    files = ["file1.txt", "file2.txt", "file3.txt"]
+    parser = argparse.ArgumentParser(description="Count words in files in parallel.")
+    parser.add_argument("files", nargs="*", help="files to count (default: three sample files)")
+    parser.add_argument("--workers", type=int, help="number of processes (default: all CPUs)")
+    parser.add_argument("--chunk-size", type=int, default=CHUNK_SIZE // (1024 * 1024),
+                        help="split files into ranges of this many MB")
+    parser.add_argument("--top", type=int, default=10, help="show the most common words")
+    parser.add_argument("--aggregate", choices=AGGREGATIONS, default="pickle",
+                        help="how workers send their counts back")
+    parser.add_argument("--benchmark", type=int, nargs="?", const=200, metavar="MEGABYTES",
+                        help="compare with counting whole files")
+    args = parser.parse_args()
+
+    if args.benchmark:
+        benchmark(args.benchmark, args.workers)
+    else:
+        # List of text files
+        files = args.files or create_sample_files()
 
-    # Run multiprocessing word count
-    results = count_words_in_multiple_files(files)
+        # Run multiprocessing word count
+        totals, frequencies = word_count(files, args.workers, args.chunk_size * 1024 * 1024, args.aggregate)
 
-    # Print results
-    for file, count in results:
-        print(f"{file}: {count} words")
+        # Print results
+        for file in files:
+            print(f"{file}: {totals[file]} words")
+        for word, count in frequencies.most_common(args.top):
+            print(f"{count:>10,}  {word}")
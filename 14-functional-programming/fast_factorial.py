@@ -0,0 +1,205 @@
+# Factorials of big numbers (n up to a million and more).
+#
+# The loop in 08-loops/01-factorial-calculator.py multiplies one term at a
+# time: 1*2, then *3, then *4 ... Every step multiplies an ever longer number
+# by a short one, so the total work grows with the square of the number of
+# digits. The recursive version in 02-memoized-factorial.py does the same
+# multiplications and also hits RecursionError at a few hundred.
+#
+# Big multiplications are cheapest when both numbers have about the same
+# size (Python then switches to Karatsuba). Three ways to get there, all
+# without recursion:
+#
+#   factorial(n)               product tree: multiply neighbours pairwise,
+#                              then the results pairwise, and so on
+#   factorial_prime_swing(n)   Luschny's prime swing: n! = (n//2)!**2 * swing(n),
+#                              where swing(n) is a product of prime powers; the
+#                              powers of two are added at the end as one shift
+#   FactorialCache             keeps some factorials (checkpoints) and continues
+#                              from the nearest one below n
+#
+# math.factorial does the same kind of splitting in C and is the reference.
+#
+# Run this file to compare them:
+#   python fast_factorial.py [n ...]
+
+import importlib.util
+import math
+import os
+import sys
+import time
+from bisect import bisect_right
+
+from memoize import LRUCache
+
+LEAF_SIZE = 16  # Consecutive numbers multiplied one by one at the bottom of the tree
+
+
+# Multiply all the numbers pairwise, level by level, until one is left
+def product(numbers):
+    numbers = list(numbers)
+    if not numbers:
+        return 1
+    while len(numbers) > 1:
+        paired = [a * b for a, b in zip(numbers[::2], numbers[1::2])]
+        if len(numbers) % 2:
+            paired.append(numbers[-1])
+        numbers = paired
+    return numbers[0]
+
+
+# Product of the integers in [low, high)
+def range_product(low, high):
+    if high - low <= LEAF_SIZE:
+        return math.prod(range(low, high))
+    # Leaves of LEAF_SIZE small numbers each still fit in a few machine words
+    return product(math.prod(range(start, min(start + LEAF_SIZE, high)))
+                   for start in range(low, high, LEAF_SIZE))
+
+
+def factorial(n):
+    if n < 0:
+        raise ValueError("factorial() not defined for negative values")
+    return range_product(2, n + 1)
+
+
+# Odd primes up to n
+def odd_primes(n):
+    if n < 3:
+        return []
+    sieve = bytearray([1]) * (n + 1)
+    sieve[0:2] = b"\0\0"
+    for p in range(2, math.isqrt(n) + 1):
+        if sieve[p]:
+            sieve[p * p::p] = bytes(len(range(p * p, n + 1, p)))
+    return [p for p in range(3, n + 1, 2) if sieve[p]]
+
+
+# Odd part of swing(n) = n! / (n//2)!**2. The exponent of a prime p in it is
+# the number of odd values among n//p, n//p**2, ...
+def odd_swing(n, primes):
+    if n < 3:
+        return 1
+    middle = bisect_right(primes, math.isqrt(n))
+    end = bisect_right(primes, n)
+    factors = []
+    for p in primes[:middle]:
+        q, power = n, 1
+        while q:
+            q //= p
+            if q & 1:
+                power *= p
+        if power > 1:
+            factors.append(power)
+    # Above sqrt(n) the exponent is just (n // p) & 1
+    factors.extend(p for p in primes[middle:end] if (n // p) & 1)
+    return product(factors)
+
+
+def factorial_prime_swing(n):
+    if n < 0:
+        raise ValueError("factorial() not defined for negative values")
+    if n < 2:
+        return 1
+    primes = odd_primes(n)
+    # Odd part of m! for m = 1, 3, ..., n//2, n from the bottom up:
+    # odd(m!) = odd((m//2)!)**2 * odd(swing(m))
+    steps = []
+    m = n
+    while m > 1:
+        steps.append(m)
+        m //= 2
+    odd = 1
+    for m in reversed(steps):
+        odd = odd * odd * odd_swing(m, primes)
+    # n! has n - (number of 1 bits in n) factors of two
+    return odd << (n - bin(n).count("1"))
+
+
+class FactorialCache:
+    # Keeps the factorials of multiples of `step` it passes on the way to the
+    # ones asked for, up to `maxbytes` of them (least recently used go first).
+    # factorial(n) then only multiplies the numbers between the nearest
+    # checkpoint and n.
+    def __init__(self, step=10_000, maxbytes=64 * 1024 * 1024):
+        self.step = step
+        self.checkpoints = LRUCache(maxsize=None, maxbytes=maxbytes)
+        self.keys = [0]  # Sorted checkpoint positions; may include evicted ones
+        self.checkpoints.put(0, 1)
+
+    def factorial(self, n):
+        if n < 0:
+            raise ValueError("factorial() not defined for negative values")
+        # Nearest checkpoint at or below n that is still cached
+        index = bisect_right(self.keys, n)
+        while True:
+            index -= 1
+            start = self.keys[index]
+            value = self.checkpoints.get(start)
+            if value is not None:
+                break
+            if start:
+                del self.keys[index]  # Evicted
+            else:
+                value = 1  # 0! is never worth evicting for
+                break
+        # Save the last multiple of `step` below n on the way
+        checkpoint = n - n % self.step
+        if checkpoint > start:
+            value *= range_product(start + 1, checkpoint + 1)
+            self.checkpoints.put(checkpoint, value)
+            self.keys.insert(bisect_right(self.keys, checkpoint), checkpoint)
+            start = checkpoint
+        return value * range_product(start + 1, n + 1)
+
+    def cache_info(self):
+        return self.checkpoints.info()
+
+
+# The loop from 08-loops/01-factorial-calculator.py
+def factorial_loop(num):
+    factorial = 1
+    for i in range(1, num + 1):
+        factorial *= i
+    return factorial
+
+
+# The recursive, memoized factorial from 02-memoized-factorial.py
+def load_recursive_factorial():
+    path = os.path.join(os.path.dirname(os.path.abspath(__file__)), "02-memoized-factorial.py")
+    spec = importlib.util.spec_from_file_location("memoized_factorial", path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module.factorial
+
+
+def benchmark(sizes=(300, 1_000, 10_000, 100_000, 1_000_000), slow_limit=100_000):
+    recursive = load_recursive_factorial()
+    cache = FactorialCache()
+    # "cache" fills the checkpoints, "again" asks for the same n once more
+    print(f"{'n':>10} {'loop':>9} {'recursive':>10} {'tree':>9} {'swing':>9} {'cache':>9} {'again':>9} {'math':>9}")
+    for n in sizes:
+        expected = math.factorial(n)
+        row = []
+        for name, function in (("loop", factorial_loop), ("recursive", recursive),
+                               ("tree", factorial), ("swing", factorial_prime_swing),
+                               ("cache", cache.factorial), ("again", cache.factorial),
+                               ("math", math.factorial)):
+            if name == "loop" and n > slow_limit:
+                row.append("skipped")
+                continue
+            start = time.perf_counter()
+            try:
+                result = function(n)
+            except RecursionError:
+                row.append("too deep")
+                continue
+            elapsed = time.perf_counter() - start
+            assert result == expected, name
+            row.append(f"{elapsed:.4f}s")
+        print(f"{n:>10,} {row[0]:>9} {row[1]:>10} " + " ".join(f"{cell:>9}" for cell in row[2:]))
+    print(f"checkpoints: {cache.cache_info()}")
+
+
+if __name__ == "__main__":
+    benchmark(*([tuple(int(arg) for arg in sys.argv[1:])] if sys.argv[1:] else []))
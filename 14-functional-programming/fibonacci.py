@@ -0,0 +1,176 @@
+# Fibonacci numbers: single terms for huge n, and long runs of the sequence.
+#
+# The recursive fibonacci in workshop-6-days/day-4.py makes about 1.6**n calls
+# without a cache, and even memoized it needs n calls and n stack frames. The
+# loop in day-2.py walks up one term at a time. Here:
+#
+#   fibonacci(n)                  fast doubling: from F(k) and F(k+1),
+#                                   F(2k)   = F(k) * (2*F(k+1) - F(k))
+#                                   F(2k+1) = F(k)**2 + F(k+1)**2
+#                                 one step per bit of n, so about log2(n)
+#                                 multiplications instead of n additions
+#   fibonacci_mod(n, m)           the same, keeping every number below m
+#   fibonacci_sequence(start)     lazy generator of F(start), F(start + 1), ...
+#   fibonacci_chunks(...)         the sequence as lists of `chunk_size` terms,
+#                                 for long prefixes in bounded memory
+#   fibonacci_mod_array(...)      count terms mod m packed in an array('Q')
+#
+# Every generator can start anywhere: fast doubling jumps to the start.
+#
+# Run this file to benchmark across n:
+#   python fibonacci.py
+
+import sys
+import time
+from array import array
+from itertools import islice
+
+
+# (F(n), F(n + 1)), walking the bits of n from the top
+def fibonacci_pair(n):
+    if n < 0:
+        raise ValueError("n must be >= 0")
+    a, b = 0, 1  # F(0), F(1)
+    for bit in bin(n)[2:]:
+        c = a * ((b << 1) - a)  # F(2k)
+        d = a * a + b * b  # F(2k + 1)
+        if bit == "1":
+            a, b = d, c + d
+        else:
+            a, b = c, d
+    return a, b
+
+
+def fibonacci(n):
+    return fibonacci_pair(n)[0]
+
+
+# (F(n) mod m, F(n + 1) mod m)
+def fibonacci_pair_mod(n, m):
+    if n < 0:
+        raise ValueError("n must be >= 0")
+    if m < 1:
+        raise ValueError("m must be >= 1")
+    a, b = 0, 1 % m
+    for bit in bin(n)[2:]:
+        c = a * ((b << 1) - a) % m
+        d = (a * a + b * b) % m
+        if bit == "1":
+            a, b = d, (c + d) % m
+        else:
+            a, b = c, d
+    return a, b
+
+
+def fibonacci_mod(n, m):
+    return fibonacci_pair_mod(n, m)[0]
+
+
+# F(start), F(start + 1), ... forever (use islice for a prefix)
+def fibonacci_sequence(start=0):
+    a, b = fibonacci_pair(start)
+    while True:
+        yield a
+        a, b = b, a + b
+
+
+# F(start) ... F(start + count - 1) as lists of up to `chunk_size` terms
+def fibonacci_chunks(count, start=0, chunk_size=10_000):
+    a, b = fibonacci_pair(start)
+    while count > 0:
+        size = min(chunk_size, count)
+        chunk = [0] * size
+        for i in range(size):
+            chunk[i] = a
+            a, b = b, a + b
+        count -= size
+        yield chunk
+
+
+# F(start) ... F(start + count - 1) mod m, for m up to 2**63
+def fibonacci_mod_array(count, m, start=0):
+    if not 1 <= m <= 1 << 63:
+        raise ValueError("m must be between 1 and 2**63")
+    a, b = fibonacci_pair_mod(start, m)
+    terms = array("Q", bytes(8 * count))
+    for i in range(count):
+        terms[i] = a
+        a, b = b, a + b
+        if b >= m:
+            b -= m  # a and b are both below m, so one subtraction is enough
+    return terms
+
+
+# The versions from the workshop, kept for the benchmark
+def fibonacci_recursive(n):
+    if n <= 1:
+        return n
+    return fibonacci_recursive(n - 1) + fibonacci_recursive(n - 2)
+
+
+def fibonacci_loop(n):
+    a, b = 0, 1
+    for _ in range(n):
+        a, b = b, a + b
+    return a
+
+
+def fibonacci_list(num):  # day-2.py
+    fib = [0, 1]
+    for i in range(2, num):
+        fib.append(fib[i - 1] + fib[i - 2])
+    return fib[:num]
+
+
+def timed(function, *args):
+    start = time.perf_counter()
+    result = function(*args)
+    return result, time.perf_counter() - start
+
+
+def benchmark():
+    print("Single terms F(n)")
+    print(f"{'n':>12} {'recursive':>10} {'loop':>10} {'doubling':>10} {'mod 1e9+7':>10}")
+    for n in (25, 1_000, 100_000, 1_000_000, 10_000_000):
+        cells = []
+        for function, limit in ((fibonacci_recursive, 25), (fibonacci_loop, 1_000_000)):
+            if n > limit:
+                cells.append("-")
+                continue
+            result, elapsed = timed(function, n)
+            cells.append(f"{elapsed:.4f}s")
+        result, elapsed = timed(fibonacci, n)
+        cells.append(f"{elapsed:.4f}s")
+        residue, elapsed_mod = timed(fibonacci_mod, n, 1_000_000_007)
+        assert residue == result % 1_000_000_007
+        cells.append(f"{elapsed_mod:.6f}s")
+        print(f"{n:>12,} " + " ".join(f"{cell:>10}" for cell in cells))
+    residue, elapsed = timed(fibonacci_mod, 10 ** 18, 1_000_000_007)
+    print(f"F(10**18) mod 1e9+7 = {residue} in {elapsed:.6f}s")
+
+    count = 100_000
+    print(f"\nFirst {count:,} terms")
+    expected, elapsed = timed(fibonacci_list, count)
+    print(f"{'list.append (day-2)':>24}: {elapsed:.3f}s")
+    terms, elapsed = timed(lambda: list(islice(fibonacci_sequence(), count)))
+    assert terms == expected
+    print(f"{'generator':>24}: {elapsed:.3f}s")
+    terms, elapsed = timed(lambda: [term for chunk in fibonacci_chunks(count) for term in chunk])
+    assert terms == expected
+    print(f"{'chunks':>24}: {elapsed:.3f}s")
+    chunk, elapsed = timed(lambda: next(fibonacci_chunks(1_000, start=count - 1_000)))
+    assert chunk == expected[-1_000:]
+    print(f"{'last 1,000 terms only':>24}: {elapsed:.3f}s")
+
+    count = 10_000_000
+    m = 1_000_000_007
+    terms, elapsed = timed(fibonacci_mod_array, count, m)
+    assert terms[-1] == fibonacci_mod(count - 1, m)
+    # A list needs a pointer plus an int object per term
+    list_bytes = (8 + sys.getsizeof(m - 1)) * count
+    print(f"\n{count:,} terms mod 1e9+7 into array('Q'): {elapsed:.3f}s, "
+          f"{terms.itemsize * len(terms) / 1e6:.0f} MB (as a list: about {list_bytes / 1e6:.0f} MB)")
+
+
+if __name__ == "__main__":
+    benchmark()
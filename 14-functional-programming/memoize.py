@@ -0,0 +1,362 @@
+# Memoization with bounded caches.
+#
+# functools.lru_cache(maxsize=None) keeps every result forever and only inside
+# one process. The @memoize decorator below keeps results in one of three
+# caches, each bounded by a number of entries and/or a number of bytes:
+#
+#   lru  drop the entry that was used least recently
+#   lfu  drop the entry that was used least often (ties: least recently)
+#   ttl  entries expire `ttl` seconds after they were stored; when full, drop
+#        the oldest
+#
+# Every cache counts hits, misses, evictions and expirations (cache_info())
+# and is safe to use from several threads: a lock guards the cache, and the
+# function itself runs outside the lock so a slow call never blocks lookups.
+#
+# With shared=<mapping> results are also published to a mapping that other
+# processes can see, e.g. a multiprocessing.Manager().dict(). A process that
+# misses its own cache looks there before calling the function. The shared
+# mapping takes new results only while it holds fewer than `maxsize` entries.
+#
+#     from memoize import memoize
+#
+#     @memoize(policy="lfu", maxsize=1000, maxbytes=64 * 1024 * 1024)
+#     def expensive(n):
+#         ...
+#
+#     expensive.cache_info()
+#
+# Run this file to compare the policies with lru_cache on a fibonacci workload:
+#   python memoize.py
+
+import random
+import sys
+import threading
+import time
+from collections import OrderedDict, defaultdict, namedtuple
+from functools import lru_cache, update_wrapper
+
+CacheInfo = namedtuple("CacheInfo", "hits misses shared_hits evictions expirations currsize bytes maxsize maxbytes")
+
+_MISSING = object()
+
+
+class _KwargsMark:
+    # Separates positional from keyword arguments in a key. No argument can
+    # be this object, so f(1, x=2) never shares a key with a positional call.
+    # It pickles by name and unpickles to the same instance, so keys still
+    # match in a shared cache.
+    __slots__ = ()
+
+    def __reduce__(self):
+        return "_KWARGS_MARK"
+
+    def __repr__(self):
+        return "<kwargs>"
+
+
+_KWARGS_MARK = _KwargsMark()
+_KWARGS = (_KWARGS_MARK,)
+
+
+# Hashable key for a call. A single int or str argument is its own key.
+def make_key(args, kwargs):
+    if kwargs:
+        return args + _KWARGS + tuple(sorted(kwargs.items()))
+    if len(args) == 1 and type(args[0]) in (int, str):
+        return args[0]
+    return args
+
+
+class Cache:
+    # Bookkeeping shared by all policies. Subclasses keep the entries and
+    # decide what to evict by implementing the four hooks below: _find,
+    # _add, _evict and _drop. The lock is held whenever they are called.
+    def __init__(self, maxsize=128, maxbytes=None, sizeof=sys.getsizeof):
+        self.maxsize = maxsize
+        self.maxbytes = maxbytes
+        self.sizeof = sizeof
+        self.lock = threading.Lock()
+        self.sizes = {}  # key -> bytes
+        self.bytes = 0
+        self.hits = self.misses = self.shared_hits = self.evictions = self.expirations = 0
+
+    def get(self, key, default=None):
+        with self.lock:
+            value = self._find(key)
+            if value is _MISSING:
+                self.misses += 1
+                return default
+            self.hits += 1
+            return value
+
+    def put(self, key, value):
+        size = self.sizeof(value) if self.maxbytes is not None else 0
+        if self.maxsize == 0 or (self.maxbytes is not None and size > self.maxbytes):
+            return  # Would never fit
+        with self.lock:
+            if key in self.sizes:
+                self._remove(key)
+            self._prune()
+            # Make room first, so the new entry is never the one evicted
+            while ((self.maxsize is not None and len(self.sizes) >= self.maxsize)
+                   or (self.maxbytes is not None and self.bytes + size > self.maxbytes)):
+                self._discard(self._evict())
+                self.evictions += 1
+            self._add(key, value)
+            self.sizes[key] = size
+            self.bytes += size
+
+    def clear(self):
+        with self.lock:
+            for key in list(self.sizes):
+                self._remove(key)
+            self.hits = self.misses = self.shared_hits = self.evictions = self.expirations = 0
+
+    def info(self):
+        with self.lock:
+            return CacheInfo(self.hits, self.misses, self.shared_hits, self.evictions, self.expirations,
+                             len(self.sizes), self.bytes, self.maxsize, self.maxbytes)
+
+    def __len__(self):
+        return len(self.sizes)
+
+    # Forget the bookkeeping of a key that the subclass has already dropped
+    def _discard(self, key):
+        self.bytes -= self.sizes.pop(key)
+
+    # Remove a key that is in the cache
+    def _remove(self, key):
+        self._drop(key)
+        self._discard(key)
+
+    # Drop entries that are no longer valid before making room
+    def _prune(self):
+        pass
+
+    # Value stored for `key` (counting it as a use), or _MISSING
+    def _find(self, key):
+        raise NotImplementedError
+
+    # Store a key that is not in the cache
+    def _add(self, key, value):
+        raise NotImplementedError
+
+    # Remove the entry the policy gives up first and return its key
+    def _evict(self):
+        raise NotImplementedError
+
+    # Remove the entry of a key that is in the cache
+    def _drop(self, key):
+        raise NotImplementedError
+
+
+class LRUCache(Cache):
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.entries = OrderedDict()  # Least recently used first
+
+    def _find(self, key):
+        value = self.entries.get(key, _MISSING)
+        if value is not _MISSING:
+            self.entries.move_to_end(key)
+        return value
+
+    def _add(self, key, value):
+        self.entries[key] = value
+
+    def _evict(self):
+        return self.entries.popitem(last=False)[0]
+
+    def _drop(self, key):
+        del self.entries[key]
+
+
+class LFUCache(Cache):
+    # Entries are kept in one bucket per use count, each bucket in order of
+    # last use, so finding and evicting the least used entry is O(1)
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.entries = {}  # key -> [value, uses]
+        self.buckets = defaultdict(OrderedDict)  # uses -> keys, least recently used first
+        self.min_uses = 0
+
+    def _find(self, key):
+        entry = self.entries.get(key)
+        if entry is None:
+            return _MISSING
+        uses = entry[1]
+        bucket = self.buckets[uses]
+        del bucket[key]
+        if not bucket:
+            del self.buckets[uses]
+            if self.min_uses == uses:
+                self.min_uses = uses + 1
+        entry[1] = uses + 1
+        self.buckets[uses + 1][key] = None
+        return entry[0]
+
+    def _add(self, key, value):
+        self.entries[key] = [value, 1]
+        self.buckets[1][key] = None
+        self.min_uses = 1
+
+    def _evict(self):
+        bucket = self.buckets[self.min_uses]
+        key, _ = bucket.popitem(last=False)
+        if not bucket:
+            del self.buckets[self.min_uses]
+            self.min_uses = min(self.buckets, default=0)
+        del self.entries[key]
+        return key
+
+    def _drop(self, key):
+        uses = self.entries.pop(key)[1]
+        bucket = self.buckets[uses]
+        del bucket[key]
+        if not bucket:
+            del self.buckets[uses]
+            if self.min_uses == uses:
+                self.min_uses = min(self.buckets, default=0)
+
+
+class TTLCache(Cache):
+    def __init__(self, maxsize=128, maxbytes=None, sizeof=sys.getsizeof, ttl=60.0, timer=time.monotonic):
+        super().__init__(maxsize, maxbytes, sizeof)
+        self.ttl = ttl
+        self.timer = timer
+        self.entries = OrderedDict()  # key -> (value, expires at), oldest first
+
+    def _find(self, key):
+        entry = self.entries.get(key)
+        if entry is None:
+            return _MISSING
+        if entry[1] <= self.timer():
+            self._prune()
+            return _MISSING
+        return entry[0]
+
+    # Entries all live for the same time, so the expired ones are at the front
+    def _prune(self):
+        now = self.timer()
+        while self.entries:
+            key, (_, expires) = next(iter(self.entries.items()))
+            if expires > now:
+                break
+            self._remove(key)
+            self.expirations += 1
+
+    def _add(self, key, value):
+        self.entries[key] = (value, self.timer() + self.ttl)
+
+    def _evict(self):
+        return self.entries.popitem(last=False)[0]
+
+    def _drop(self, key):
+        del self.entries[key]
+
+
+POLICIES = {"lru": LRUCache, "lfu": LFUCache, "ttl": TTLCache}
+
+
+# Decorator. maxsize/maxbytes of None mean no limit; `sizeof` measures a
+# result for maxbytes (sys.getsizeof does not follow references, so pass a
+# deeper function for containers).
+def memoize(policy="lru", maxsize=128, maxbytes=None, ttl=None, sizeof=sys.getsizeof, shared=None):
+    if policy not in POLICIES:
+        raise ValueError(f"Unknown policy {policy!r}, expected one of {', '.join(POLICIES)}")
+    if policy == "ttl":
+        cache = TTLCache(maxsize, maxbytes, sizeof, ttl=60.0 if ttl is None else ttl)
+    elif ttl is not None:
+        raise ValueError("ttl only applies to policy='ttl'")
+    else:
+        cache = POLICIES[policy](maxsize, maxbytes, sizeof)
+
+    def decorator(func):
+        def wrapper(*args, **kwargs):
+            key = make_key(args, kwargs)
+            value = cache.get(key, _MISSING)
+            if value is not _MISSING:
+                return value
+            if shared is not None:
+                try:
+                    value = shared[key]
+                except KeyError:
+                    pass
+                else:
+                    with cache.lock:
+                        cache.shared_hits += 1
+                    cache.put(key, value)
+                    return value
+            value = func(*args, **kwargs)
+            cache.put(key, value)
+            if shared is not None and (maxsize is None or len(shared) < maxsize):
+                shared[key] = value
+            return value
+
+        wrapper.cache = cache
+        wrapper.cache_info = cache.info
+        wrapper.cache_clear = cache.clear
+        return update_wrapper(wrapper, func)
+    return decorator
+
+
+def benchmark(rounds=200_000):
+    # Naive fibonacci against the same function memoized. The cache has to
+    # hold every n below the one asked for: a bounded cache that evicts
+    # fibonacci(n - 1) while computing fibonacci(n) falls back to the
+    # exponential recursion.
+    def fibonacci(n):
+        if n <= 1:
+            return n
+        return fibonacci(n - 1) + fibonacci(n - 2)
+
+    @memoize("lru", maxsize=None)
+    def memoized_fibonacci(n):
+        if n <= 1:
+            return n
+        return memoized_fibonacci(n - 1) + memoized_fibonacci(n - 2)
+
+    for name, function in (("no cache", fibonacci), ("memoize", memoized_fibonacci)):
+        start = time.perf_counter()
+        function(30)
+        print(f"{name + ', fibonacci(30)':>26}: {time.perf_counter() - start:.4f}s")
+
+    # Policies on a skewed mix of 10,000 different calls, with room for 1,000
+    rng = random.Random(0)
+    queries = [int(10_000 * rng.random() ** 4) for _ in range(rounds)]
+    for name, decorate in (("functools.lru_cache", lru_cache(maxsize=1000)),
+                           ("memoize lru", memoize("lru", maxsize=1000)),
+                           ("memoize lfu", memoize("lfu", maxsize=1000)),
+                           ("memoize ttl", memoize("ttl", maxsize=1000, ttl=60)),
+                           ("memoize lru, 32 KB", memoize("lru", maxsize=None, maxbytes=32 * 1024))):
+        @decorate
+        def square(n):
+            return n * n
+
+        start = time.perf_counter()
+        for n in queries:
+            square(n)
+        elapsed = time.perf_counter() - start
+        info = square.cache_info()
+        print(f"{name:>26}: {rounds / elapsed:>10,.0f} calls/s, hit rate {info.hits / rounds:.1%}")
+
+    # The same lookups from 8 threads at once
+    @memoize("lru", maxsize=1000)
+    def square(n):
+        return n * n
+
+    threads = [threading.Thread(target=lambda: [square(n) for n in queries]) for _ in range(8)]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - start
+    info = square.cache_info()
+    assert info.hits + info.misses == 8 * rounds
+    print(f"{'8 threads, memoize lru':>26}: {8 * rounds / elapsed:>10,.0f} calls/s, {info}")
+
+
+if __name__ == "__main__":
+    benchmark()
@@ -38,6 +38,7 @@ print(
     -------------------------------------------
     '''
 )
+# To make report cards for a whole class at once, see report_cards.py
 
 # Loops
 
@@ -148,6 +149,8 @@ for i in range(1, num + 1):
 print(sum)
 
 # Fibonacci series
+# (For single terms of huge n or long runs of the sequence, see
+# 14-functional-programming/fibonacci.py)
 num = int(input('Enter a number: '))
 fib = [0, 1]
 for i in range(2, num):
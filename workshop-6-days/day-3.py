@@ -48,11 +48,10 @@ def display_student(student):
     print('City:', student['city'])
 
 # 3. Search student function
+# The name is the primary key, so students are kept in a dictionary name -> student
+# and found with one lookup instead of checking every student in a list
 def search_student(name, students):
-    for student in students: # Iterate through the list of students to find the student
-        if student['name'] == name:
-            return student # Return the student if found
-    return None # Return None if student not found
+    return students.get(name) # Return None if student not found
 
 # 4. Update student function
 def update_student(name, students):
@@ -66,9 +65,8 @@ def update_student(name, students):
 
 # 5. Delete student function
 def delete_student(name, students):
-    student = search_student(name, students) # Search for the student
+    student = students.pop(name, None) # Remove it by key instead of list.remove searching the list again
     if student:
-        students.remove(student)
         print(f'{student['name']} removed successfully.')
     else:
         print('Student not found')
@@ -78,7 +76,7 @@ def exit_program():
     print('Exiting program')
     exit()
 
-students = [] # Empty list for the students
+students = {} # Empty dictionary for the students: name -> student
 
 # Main program
 while True:
@@ -95,11 +93,15 @@ while True:
     choice = int(input('Enter your choice: '))
 
     if choice == 1: # Add student
-        students.append(add_student())
+        student = add_student()
+        if student['name'] in students: # Names must be unique now that they are the key
+            print('Student already exists.')
+        else:
+            students[student['name']] = student
 
     elif choice == 2: # Display student
         print('Details for all students is as follows: ')
-        for student in students:
+        for student in students.values():
             print('-'*20)
             print(f'Details for {student['name']}')
             display_student(student)
@@ -132,6 +132,16 @@ result = sum_natural(10)
 print('Sum of natural numbers:', result)
 
 # Fibonacci series using recursion
+# Without a cache fibonacci(n) calls itself about 1.6**n times, computing the
+# same values over and over. @memoize remembers every result, so each n is
+# computed once. It must keep all of them (maxsize=None): evicting
+# fibonacci(n - 1) would bring the repeated calls back.
+import os
+import sys
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '14-functional-programming'))
+from memoize import memoize # Memoization with eviction policies and stats (14-functional-programming/memoize.py)
+
+@memoize('lru', maxsize=None)
 def fibonacci(n):
     if n <= 1:
         return n
@@ -231,6 +241,8 @@ print('Result:', result)
 
 # Crete a student management system using functions and file handling
 import json
+from student_registry import StudentRegistry # Students indexed by roll and name (student_registry.py)
+from student_storage import StudentStore # Incremental, crash-safe student file (student_storage.py)
 
 # 1. Add student function
 def add_student():
@@ -248,44 +260,67 @@ def display_student(student):
     print('Marks:', student['marks'])
 
 # 3. Search student function
+# The registry looks the roll number up in a dictionary instead of checking every student
 def search_student(roll, students):
-    for student in students:
-        if student['roll'] == roll:
-            return student
-    return None
+    return students.search(roll)
 
 # 4. Update student function
 def update_student(roll, students):
-    student = search_student(roll, students)
+    if roll not in students:
+        print('Student not found')
+        return
+    changes = {
+        'name': input('Enter student name: '),
+        'age': int(input('Enter student age: ')),
+        'roll': int(input('Enter student roll number: ')),
+        'marks': int(input('Enter student marks: ')),
+    }
+    if not students.update(roll, changes): # The registry re-indexes the student if the roll number changes
+        print('Roll number already exists.')
+
+# 5. Delete student function
+def delete_student(roll, students):
+    student = students.delete(roll)
     if student:
-        student['name'] = input('Enter student name: ')
-        student['age'] = int(input('Enter student age: '))
-        student['roll'] = int(input('Enter student roll number: '))
-        student['marks'] = int(input('Enter student marks: '))
+        print(f"{student['name']} removed successfully.")
     else:
         print('Student not found')
 
-# 5. Save students to file
+# 6. Save students to file
+# Only the students added, changed or deleted since the last save are written
 def save_students(students):
-    with open('students.json', 'w') as file:
-        json.dump(students, file)
+    saved = students.store.save(students)
+    print(f'{saved} change(s) saved.')
+
+# 7. Load students from file
+# Nothing is read yet: each student is loaded from the file when it is first searched for
+def load_students(store):
+    return StudentRegistry(store=store)
 
-# 6. Load students from file
-def load_students():
+# Copy the students of the old students.json into a new students.db, once
+def import_json_students(students, path='students.json'):
     try:
-        with open('students.json', 'r') as file:
-            students = json.load(file)
+        with open(path, 'r') as file:
+            old_students = json.load(file)
     except FileNotFoundError:
-        students = []
-    return students
+        return
+    for student in old_students:
+        students.add(student)
+    print(f'Imported {len(old_students)} student(s) from {path}.')
+    save_students(students)
 
-# 7. Exit program function
+# 8. Exit program function
 def exit_program():
     print('Exiting program')
     exit()
 
 # Driver code
-students = [] # Empty list for the students
+# format: 'json' (same records as students.json), 'compact' or 'binary' (see student_codec.py)
+new_store = not os.path.exists('students.db')
+store = StudentStore('students.db', format='json')
+students = load_students(store) # Registry backed by the student file
+if new_store:
+    import_json_students(students)
 
 while True:
     print('='*20)
@@ -293,16 +328,18 @@ while True:
     print('2. Display student')
     print('3. Search student')
     print('4. Update student')
-    print('5. Save students')
-    print('6. Load students')
-    print('7. Exit')
+    print('5. Delete student')
+    print('6. Save students')
+    print('7. Load students')
+    print('8. Exit')
     print('-'*20)
 
     choice = int(input('Enter your choice: '))
 
     match choice:
         case 1: # Add student
-            students.append(add_student())
+            if not students.add(add_student()):
+                print('Roll number already exists.')
 
         case 2: # Display student
             roll = int(input('Enter student roll number: '))
@@ -324,13 +361,17 @@ while True:
             roll = int(input('Enter student roll number: '))
             update_student(roll, students)
 
-        case 5: # Save students
+        case 5: # Delete student
+            roll = int(input('Enter student roll number: '))
+            delete_student(roll, students)
+
+        case 6: # Save students
             save_students(students)
 
-        case 6: # Load students
-            students = load_students()
+        case 7: # Load students (drops unsaved changes)
+            students = load_students(store)
 
-        case 7: # Exit
+        case 8: # Exit
             exit_program()
         
         case _:
@@ -2,62 +2,529 @@
 # LIBRARY MANAGEMENT SYSTEM
 # =============================================================
 
+import csv
+import json
+import os
+import sys
+import threading
+from bisect import bisect_left, bisect_right, insort
+from contextlib import ExitStack, contextmanager, nullcontext
+from itertools import chain, compress, filterfalse, islice
+from operator import attrgetter, sub
+
+# Column order used by the CSV and JSON Lines import/export helpers
+FIELDS = ("title", "author", "isbn", "is_borrowed")
+
+# Books per block of an OrderedBooks listing (blocks are split at twice this)
+BLOCK_SIZE = 512
+
+# Most books one page may hold: a page is copied while every lock is held
+MAX_PAGE_SIZE = 1000
+
+
 class Book:
+    # __slots__ stores the four attributes in fixed slots instead of a
+    # per-instance __dict__, which is most of the memory of a small object.
+    __slots__ = ("title", "author", "isbn", "is_borrowed", "seq")
+
     def __init__(self, title, author, isbn):
         self.title = title
-        self.author = author
+        # Many books share an author, so keep one copy of each author string
+        self.author = sys.intern(author)
         self.isbn = isbn
         self.is_borrowed = False
+        # Set when the book enters a Library: its position in the catalog order
+        self.seq = 0
 
     def __str__(self):
         return f"{self.title} by {self.author} (ISBN: {self.isbn})"
 
 
-class Library:
+seq_of = attrgetter("seq")
+is_borrowed_of = attrgetter("is_borrowed")
+
+
+class OrderedBooks:
+    # Books sorted by seq, in blocks of up to 2 * BLOCK_SIZE: adding or
+    # removing a book shifts one short block instead of the whole list, and
+    # listing can start right after any seq with two bisects. This is what
+    # lets a page cursor resume where the last page ended. Each block also
+    # counts its borrowed books, so listing only the available or only the
+    # borrowed books skips the blocks that have none.
+    __slots__ = ("blocks", "maxes", "borrowed", "size")
+
     def __init__(self):
-        self.books = []
+        self.blocks = []  # Lists of books, each sorted by seq
+        self.maxes = []  # Largest seq in each block
+        self.borrowed = []  # Borrowed books in each block
+        self.size = 0
+
+    def __len__(self):
+        return self.size
+
+    def __iter__(self):
+        return chain.from_iterable(self.blocks)
+
+    def add(self, book):
+        self.size += 1
+        if not self.blocks:
+            self.blocks.append([book])
+            self.maxes.append(book.seq)
+            self.borrowed.append(int(book.is_borrowed))
+            return
+        if book.seq > self.maxes[-1]:
+            # New books have the largest seq so far: append to the last block
+            i = len(self.blocks) - 1
+            block = self.blocks[i]
+            block.append(book)
+        else:
+            i = bisect_left(self.maxes, book.seq)
+            block = self.blocks[i]
+            insort(block, book, key=seq_of)
+        self.maxes[i] = block[-1].seq
+        self.borrowed[i] += book.is_borrowed
+        if len(block) > 2 * BLOCK_SIZE:
+            halves = [block[:BLOCK_SIZE], block[BLOCK_SIZE:]]
+            self.blocks[i:i + 1] = halves
+            self.maxes.insert(i, halves[0][-1].seq)
+            self.borrowed[i:i + 1] = [sum(map(is_borrowed_of, half)) for half in halves]
+
+    def remove(self, book):
+        i = bisect_left(self.maxes, book.seq)
+        block = self.blocks[i]
+        del block[bisect_left(block, book.seq, key=seq_of)]
+        self.size -= 1
+        self.borrowed[i] -= book.is_borrowed
+        if block:
+            self.maxes[i] = block[-1].seq
+        else:
+            del self.blocks[i], self.maxes[i], self.borrowed[i]
+
+    def set_borrowed(self, book, is_borrowed):
+        if book.is_borrowed != is_borrowed:
+            self.borrowed[bisect_left(self.maxes, book.seq)] += 1 if is_borrowed else -1
+            book.is_borrowed = is_borrowed
 
+    # Books with a seq greater than `seq`, in order. With `borrowed` True or
+    # False, only the borrowed or only the available ones. Built from
+    # itertools over ranges, so nothing is copied and no Python code runs per
+    # book.
+    def after(self, seq, borrowed=None):
+        first = bisect_right(self.maxes, seq)
+        if first == len(self.blocks):
+            return iter(())
+        block = self.blocks[first]
+        books = map(block.__getitem__, range(bisect_right(block, seq, key=seq_of), len(block)))
+        rest = range(first + 1, len(self.blocks))
+        if borrowed is not None:
+            # Skip the blocks with nothing wanted in them
+            counts = islice(self.borrowed, first + 1, None)
+            if not borrowed:
+                counts = map(sub, map(len, islice(self.blocks, first + 1, None)), counts)
+            rest = compress(rest, counts)
+        books = chain(books, chain.from_iterable(map(self.blocks.__getitem__, rest)))
+        if borrowed is None:
+            return books
+        return filter(is_borrowed_of, books) if borrowed else filterfalse(is_borrowed_of, books)
+
+
+class Library:
+    def __init__(self, thread_safe=False, verbose=True, lock_stripes=64):
+        # Books are indexed by ISBN so every lookup is a single dict access
+        # instead of a walk over the whole catalog. Dicts keep insertion order,
+        # so display_books still lists books in the order they were added.
+        self.books = {}
+        # The same order as a listing pages can resume in, also used to list
+        # only the available or only the borrowed books without scanning the
+        # catalog. next_seq is given to the next book added (Book.seq).
+        self.listing = OrderedBooks()
+        self.next_seq = 1
+        # Secondary indexes: author/title -> {isbn: book}. The inner dicts make
+        # removing one book from an index O(1) as well.
+        self.by_author = {}
+        self.by_title = {}
+        # When False, the single-book methods only return True/False and
+        # don't print a message.
+        self.verbose = verbose
+        # Set by Library.open() to make every change durable
+        self.journal = None
+
+        # Concurrency mode. Borrow/return only take the lock of the stripe
+        # their ISBN hashes to, so checkouts of different books run in
+        # parallel. Adding/removing books changes the shared indexes and also
+        # takes the catalog lock. The listing is shared by every stripe, so
+        # each change to it (add, remove, borrowed counts) also holds the
+        # short listing lock. Without thread_safe all locks are no-ops.
+        if thread_safe:
+            self._catalog_lock = threading.Lock()
+            self._listing_lock = threading.Lock()
+            self._stripes = [threading.Lock() for _ in range(lock_stripes)]
+        else:
+            self._catalog_lock = nullcontext()
+            self._listing_lock = nullcontext()
+            self._stripes = [nullcontext()]
+
+    # Open a Library whose changes are journaled in `folder`, restoring the
+    # state left there by a previous run
+    @classmethod
+    def open(cls, folder, snapshot_every=100_000, fsync=False, **options):
+        library = cls(**options)
+        journal = Journal(folder, snapshot_every, fsync)
+        journal.replay(library)
+        library.journal = journal
+        return library
+
+    def close(self):
+        if self.journal is not None:
+            self.journal.close()
+
+    def _lock_for(self, isbn):
+        return self._stripes[hash(isbn) % len(self._stripes)]
+
+    # Hold the catalog lock and every stripe lock: nothing can change
+    @contextmanager
+    def _all_locks(self):
+        with self._catalog_lock, ExitStack() as stack:
+            for lock in self._stripes:
+                stack.enter_context(lock)
+            yield
+
+    def _say(self, message):
+        if self.verbose:
+            print(message)
+
+    # Keep all three indexes in sync when a book enters or leaves the catalog
+    def _index(self, book):
+        book.seq = self.next_seq
+        self.next_seq += 1
+        self.books[book.isbn] = book
+        with self._listing_lock:
+            self.listing.add(book)
+        self.by_author.setdefault(book.author, {})[book.isbn] = book
+        self.by_title.setdefault(book.title, {})[book.isbn] = book
+
+    def _unindex(self, book):
+        del self.books[book.isbn]
+        with self._listing_lock:
+            self.listing.remove(book)
+        for index, key in ((self.by_author, book.author), (self.by_title, book.title)):
+            entries = index[key]
+            del entries[book.isbn]
+            if not entries:
+                del index[key]
+
+    def _set_borrowed(self, book, is_borrowed):
+        with self._listing_lock:
+            self.listing.set_borrowed(book, is_borrowed)
+
+    # Write one change to the journal. Called while the book's locks are held,
+    # so the log order matches the order the changes were applied in.
+    def _record(self, *entry, flush=True):
+        if self.journal is not None:
+            self.journal.append(entry, flush)
+
+    # Apply a journaled change during recovery
+    def _apply(self, entry):
+        op, *args = entry
+        if op == "add":
+            book = Book(*args[:3])
+            book.is_borrowed = args[3]
+            self._index(book)
+        elif op == "remove":
+            self._unindex(self.books[args[0]])
+        else:
+            self._set_borrowed(self.books[args[0]], op == "borrow")
+
+    def _snapshot_due(self):
+        return self.journal.since_snapshot >= self.journal.snapshot_every
+
+    def _maybe_snapshot(self):
+        if self.journal is not None and self._snapshot_due():
+            with self._all_locks():
+                # Another thread may have taken the snapshot while this one
+                # waited for the locks
+                if self._snapshot_due():
+                    self.journal.write_snapshot(self.books.values())
+
+    # Write the whole catalog to a snapshot and start a new, empty log
+    def snapshot(self):
+        if self.journal is None:
+            raise ValueError("This library has no journal: open it with Library.open(folder).")
+        with self._all_locks():
+            self.journal.write_snapshot(self.books.values())
+
+    def get_book(self, isbn):
+        return self.books.get(isbn)
+
+    def find_by_author(self, author):
+        with self._catalog_lock:
+            return list(self.by_author.get(author, {}).values())
+
+    def find_by_title(self, title):
+        with self._catalog_lock:
+            return list(self.by_title.get(title, {}).values())
+
+    # The single-book methods return True when the operation took effect
     def add_book(self, book):
-        self.books.append(book)
-        print(f"Book '{book.title}' added to the library.")
+        with self._catalog_lock, self._lock_for(book.isbn):
+            if book.isbn in self.books:
+                self._say(f"A book with ISBN {book.isbn} already exists.")
+                return False
+            self._index(book)
+            self._record("add", book.title, book.author, book.isbn, book.is_borrowed)
+        self._say(f"Book '{book.title}' added to the library.")
+        self._maybe_snapshot()
+        return True
 
     def remove_book(self, isbn):
-        for book in self.books:
-            if book.isbn == isbn:
-                self.books.remove(book)
-                print(f"Book '{book.title}' removed from the library.")
-                return
-        print("Book not found.")
+        with self._catalog_lock, self._lock_for(isbn):
+            book = self.books.get(isbn)
+            if book is None:
+                self._say("Book not found.")
+                return False
+            self._unindex(book)
+            self._record("remove", isbn)
+        self._say(f"Book '{book.title}' removed from the library.")
+        self._maybe_snapshot()
+        return True
 
     def borrow_book(self, isbn):
-        for book in self.books:
-            if book.isbn == isbn:
-                if not book.is_borrowed:
-                    book.is_borrowed = True
-                    print(f"Book '{book.title}' has been borrowed.")
-                else:
-                    print(f"Book '{book.title}' is already borrowed.")
-                return
-        print("Book not found.")
+        # Check-then-set happens under the stripe lock, so two threads can
+        # never both borrow the same copy
+        with self._lock_for(isbn):
+            book = self.books.get(isbn)
+            if book is None:
+                self._say("Book not found.")
+                return False
+            if book.is_borrowed:
+                self._say(f"Book '{book.title}' is already borrowed.")
+                return False
+            self._set_borrowed(book, True)
+            self._record("borrow", isbn)
+        self._say(f"Book '{book.title}' has been borrowed.")
+        self._maybe_snapshot()
+        return True
 
     def return_book(self, isbn):
-        for book in self.books:
-            if book.isbn == isbn:
-                if book.is_borrowed:
-                    book.is_borrowed = False
-                    print(f"Book '{book.title}' has been returned.")
-                else:
-                    print(f"Book '{book.title}' was not borrowed.")
-                return
-        print("Book not found.")
-
-    def display_books(self):
-        if not self.books:
-            print("No books in the library.")
-        else:
-            for book in self.books:
-                status = "Available" if not book.is_borrowed else "Borrowed"
-                print(f"{book} - {status}")
+        with self._lock_for(isbn):
+            book = self.books.get(isbn)
+            if book is None:
+                self._say("Book not found.")
+                return False
+            if not book.is_borrowed:
+                self._say(f"Book '{book.title}' was not borrowed.")
+                return False
+            self._set_borrowed(book, False)
+            self._record("return", isbn)
+        self._say(f"Book '{book.title}' has been returned.")
+        self._maybe_snapshot()
+        return True
+
+    # Bulk operations: no per-book print, one summary count instead
+    def add_books(self, books):
+        added = 0
+        with self._catalog_lock:
+            for book in books:
+                with self._lock_for(book.isbn):
+                    if book.isbn not in self.books:
+                        self._index(book)
+                        self._record("add", book.title, book.author, book.isbn,
+                                     book.is_borrowed, flush=False)
+                        added += 1
+            if self.journal is not None:
+                self.journal.flush()
+        self._maybe_snapshot()
+        return added
+
+    def remove_books(self, isbns):
+        removed = 0
+        with self._catalog_lock:
+            for isbn in isbns:
+                with self._lock_for(isbn):
+                    book = self.books.get(isbn)
+                    if book is not None:
+                        self._unindex(book)
+                        self._record("remove", isbn, flush=False)
+                        removed += 1
+            if self.journal is not None:
+                self.journal.flush()
+        self._maybe_snapshot()
+        return removed
+
+    # Streaming import/export. Rows are read and written one at a time, so the
+    # whole file is never held in memory.
+    def load_csv(self, path):
+        with open(path, "r", newline="", encoding="utf-8") as file:
+            return self.add_books(read_books_csv(file))
+
+    def dump_csv(self, path):
+        with self._catalog_lock, open(path, "w", newline="", encoding="utf-8") as file:
+            writer = csv.writer(file)
+            writer.writerow(FIELDS)
+            writer.writerows(
+                (book.title, book.author, book.isbn, int(book.is_borrowed))
+                for book in self.books.values()
+            )
+        return len(self.books)
+
+    def load_jsonl(self, path):
+        with open(path, "r", encoding="utf-8") as file:
+            return self.add_books(read_books_jsonl(file))
+
+    def dump_jsonl(self, path):
+        with self._catalog_lock, open(path, "w", encoding="utf-8") as file:
+            file.writelines(book_to_json(book) + "\n" for book in self.books.values())
+        return len(self.books)
+
+    # Lazy iterator over the books matching the filters, in catalog order,
+    # starting after the book whose seq is `after`. `status` is "available"
+    # or "borrowed". The smallest matching index is walked instead of the
+    # catalog.
+    def iter_books(self, status=None, author=None, after=0):
+        wanted = None if status is None else status == "borrowed"
+        if author is None:
+            return self.listing.after(after, wanted)
+        # An author's books are a small dict, also in catalog order
+        books = list(self.by_author.get(author, {}).values())
+        books = islice(books, bisect_right(books, after, key=seq_of), None)
+        if wanted is None:
+            return books
+        return filter(is_borrowed_of, books) if wanted else filterfalse(is_borrowed_of, books)
+
+    # One page of books plus the cursor of the next page (None on the last
+    # page). The cursor is the seq of the last book shown: the next page
+    # starts right after it however deep it is, and books added or removed
+    # in between don't make later pages skip or repeat books. `limit` must be
+    # at least 1 and is capped at MAX_PAGE_SIZE.
+    def page(self, limit=20, cursor=0, status=None, author=None):
+        if limit < 1:
+            raise ValueError(f"page limit must be at least 1, got {limit}")
+        limit = min(limit, MAX_PAGE_SIZE)
+        with self._all_locks():
+            books = list(islice(self.iter_books(status, author, cursor), limit + 1))
+        if len(books) > limit:
+            return books[:limit], books[limit - 1].seq
+        return books, None
+
+    # Print one page with a single write and return the next page's cursor
+    def display_books(self, limit=20, cursor=0, status=None, author=None):
+        books, next_cursor = self.page(limit, cursor, status, author)
+        if not books:
+            print("No books in the library." if cursor == 0 else "No more books.")
+            return None
+        lines = [f"{book} - {'Borrowed' if book.is_borrowed else 'Available'}" for book in books]
+        sys.stdout.write("\n".join(lines) + "\n")
+        return next_cursor
+
+
+class Journal:
+    # Durable history of a Library: an append-only log with one JSON line per
+    # change, plus a periodic snapshot of the whole catalog. Each log entry
+    # carries a sequence number and the snapshot records the last one it
+    # contains, so startup loads the snapshot and replays only the newer tail.
+    def __init__(self, folder, snapshot_every=100_000, fsync=False):
+        os.makedirs(folder, exist_ok=True)
+        self.log_path = os.path.join(folder, "library.log")
+        self.snapshot_path = os.path.join(folder, "library.snapshot")
+        self.snapshot_every = snapshot_every
+        # flush() protects against a process crash; fsync also against power loss
+        self.fsync = fsync
+        self.seq = 0
+        self.since_snapshot = 0
+        self._lock = threading.Lock()
+        self._file = None
+
+    def append(self, entry, flush=True):
+        with self._lock:
+            self.seq += 1
+            self.since_snapshot += 1
+            self._file.write(json.dumps([self.seq, *entry]) + "\n")
+            if flush:
+                self._flush()
+
+    def flush(self):
+        with self._lock:
+            self._flush()
+
+    def _flush(self):
+        self._file.flush()
+        if self.fsync:
+            os.fsync(self._file.fileno())
+
+    def replay(self, library):
+        if os.path.exists(self.snapshot_path):
+            with open(self.snapshot_path, "r", encoding="utf-8") as file:
+                self.seq = json.loads(file.readline())["seq"]
+                library.add_books(read_books_jsonl(file))
+
+        valid_bytes = 0
+        if os.path.exists(self.log_path):
+            with open(self.log_path, "rb") as file:
+                for line in file:
+                    # A crash can leave half a line at the end of the log
+                    if not line.endswith(b"\n"):
+                        break
+                    try:
+                        seq, *entry = json.loads(line)
+                    except ValueError:
+                        break
+                    valid_bytes += len(line)
+                    # Entries up to the snapshot's seq are already in the snapshot
+                    if seq > self.seq:
+                        library._apply(entry)
+                        self.seq = seq
+                        self.since_snapshot += 1
+            os.truncate(self.log_path, valid_bytes)
+        self._file = open(self.log_path, "a", encoding="utf-8")
+
+    def write_snapshot(self, books):
+        with self._lock:
+            # Write to a temporary file and rename it over the old snapshot, so
+            # a crash never leaves a half-written snapshot behind
+            temp_path = self.snapshot_path + ".tmp"
+            with open(temp_path, "w", encoding="utf-8") as file:
+                file.write(json.dumps({"seq": self.seq}) + "\n")
+                file.writelines(book_to_json(book) + "\n" for book in books)
+                file.flush()
+                os.fsync(file.fileno())
+            os.replace(temp_path, self.snapshot_path)
+            # Everything in the log is now in the snapshot
+            self._file.close()
+            self._file = open(self.log_path, "w", encoding="utf-8")
+            self.since_snapshot = 0
+
+    def close(self):
+        with self._lock:
+            self._file.close()
+
+
+def book_to_json(book):
+    return json.dumps({"title": book.title, "author": book.author,
+                       "isbn": book.isbn, "is_borrowed": book.is_borrowed})
+
+
+# Generators that turn an open CSV / JSON Lines file into Book objects
+def read_books_csv(file):
+    reader = csv.reader(file)
+    header = next(reader, None)
+    if header is None:
+        return
+    title, author, isbn = (header.index(field) for field in FIELDS[:3])
+    status = header.index("is_borrowed") if "is_borrowed" in header else None
+    for row in reader:
+        book = Book(row[title], row[author], row[isbn])
+        if status is not None:
+            book.is_borrowed = row[status] in ("1", "True", "true")
+        yield book
+
+
+def read_books_jsonl(file):
+    for line in file:
+        if line.strip():
+            record = json.loads(line)
+            book = Book(record["title"], record["author"], record["isbn"])
+            book.is_borrowed = bool(record.get("is_borrowed", False))
+            yield book
 
 
 # Example usage
@@ -79,7 +546,9 @@ if __name__ == "__main__":
         choice = input("Enter your choice: ")
 
         if choice == "1":
-            library.display_books()
+            cursor = library.display_books()
+            while cursor is not None and input("Press Enter for more, q to stop: ") != "q":
+                cursor = library.display_books(cursor=cursor)
         elif choice == "2":
             isbn = input("Enter the ISBN of the book to borrow: ")
             library.borrow_book(isbn)
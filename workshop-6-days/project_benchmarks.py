@@ -0,0 +1,231 @@
+# =============================================================
+# BENCHMARKS FOR THE LIBRARY MANAGEMENT SYSTEM (project.py)
+# =============================================================
+# Run from this folder:
+#   python project_benchmarks.py lookups [max_books]
+#   python project_benchmarks.py bulk_load [books]
+#   python project_benchmarks.py memory [books]
+#   python project_benchmarks.py stress [max_threads] [ops_per_thread]
+#   python project_benchmarks.py journal [operations] [snapshot_every]
+#   python project_benchmarks.py pages [books]
+
+import io
+import os
+import random
+import sys
+import tempfile
+import threading
+import time
+import tracemalloc
+
+from project import Book, Library
+
+
+# Build a catalog of n books without printing a line per book
+def build_library(n, **options):
+    library = Library(**options)
+    for i in range(n):
+        library._index(Book(f"Title {i}", f"Author {i % 1000}", str(1_000_000_000 + i)))
+    return library
+
+
+# Average time of one ISBN lookup for catalogs growing from 1k books upwards.
+# With the dict index the numbers should stay flat as the catalog grows.
+def benchmark_lookups(max_books=1_000_000, queries=100_000):
+    print(f"{'books':>12} {'ns/lookup':>12}")
+    n = 1_000
+    while n <= max_books:
+        library = build_library(n)
+        isbns = [str(1_000_000_000 + random.randrange(n)) for _ in range(queries)]
+        get_book = library.get_book
+        start = time.perf_counter()
+        for isbn in isbns:
+            get_book(isbn)
+        elapsed = time.perf_counter() - start
+        print(f"{n:>12,} {elapsed / queries * 1e9:>12.1f}")
+        n *= 10
+
+
+# Dump a catalog to CSV and JSON Lines, then stream it back into an empty Library
+def benchmark_bulk_load(n=1_000_000):
+    library = build_library(n)
+    with tempfile.TemporaryDirectory() as folder:
+        for name, dump, load in (("csv", Library.dump_csv, Library.load_csv),
+                                 ("jsonl", Library.dump_jsonl, Library.load_jsonl)):
+            path = os.path.join(folder, f"catalog.{name}")
+            start = time.perf_counter()
+            dump(library, path)
+            dumped = time.perf_counter() - start
+
+            start = time.perf_counter()
+            loaded = load(Library(), path)
+            elapsed = time.perf_counter() - start
+            print(f"{name:>6}: dump {dumped:.2f}s, load {loaded:,} books in {elapsed:.2f}s "
+                  f"({loaded / elapsed:,.0f} books/s)")
+
+
+# The original Book: a plain object with a per-instance __dict__
+class DictBook:
+    def __init__(self, title, author, isbn):
+        self.title = title
+        self.author = author
+        self.isbn = isbn
+        self.is_borrowed = False
+
+
+# Bytes per book (object plus its strings) for the old and the slotted Book
+def benchmark_memory(n=1_000_000):
+    for name, cls in (("before (__dict__)", DictBook), ("after (__slots__)", Book)):
+        tracemalloc.start()
+        books = [cls(f"Title {i}", f"Author {i % 1000}", str(1_000_000_000 + i)) for i in range(n)]
+        size, _ = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        print(f"{name:>18}: {size / n:.0f} bytes/book")
+        del books
+
+
+# Hammer a thread-safe Library with random borrows and returns from many
+# threads while one more thread keeps removing and re-adding extra books, so
+# listing blocks are split and deleted under the borrows. Every successful
+# borrow/return of the fixed books is counted per book; afterwards each must
+# have been borrowed either as many times as it was returned (available) or
+# exactly once more (still borrowed), and every listing block must count
+# exactly the borrowed books it holds.
+def benchmark_stress(max_threads=16, ops_per_thread=50_000, books=100, extras=2_000):
+    isbns = [str(1_000_000_000 + i) for i in range(books)]
+    extra_isbns = [str(2_000_000_000 + i) for i in range(extras)]
+    threads = 1
+    while threads <= max_threads:
+        library = build_library(books, thread_safe=True, verbose=False)
+        library.add_books(Book(f"Extra {i}", "Extra", isbn) for i, isbn in enumerate(extra_isbns))
+        borrowed = [[0] * books for _ in range(threads)]
+        returned = [[0] * books for _ in range(threads)]
+        done = threading.Event()
+        # Index of the extra book re-added last by the churn thread
+        latest = [0]
+
+        # Exceptions raised in any thread, which fail the run
+        errors = []
+
+        def worker(borrowed, returned, seed):
+            rng = random.Random(seed)
+            try:
+                for _ in range(ops_per_thread):
+                    if rng.random() < 0.5:
+                        # A recently re-added extra book, in the block being
+                        # split. It may be removed at the moment; not counted.
+                        isbn = extra_isbns[latest[0] - rng.randrange(32)]
+                        library.borrow_book(isbn)
+                        library.return_book(isbn)
+                        continue
+                    i = rng.randrange(books)
+                    if rng.random() < 0.5:
+                        borrowed[i] += library.borrow_book(isbns[i])
+                    else:
+                        returned[i] += library.return_book(isbns[i])
+            except Exception as e:
+                errors.append(e)
+
+        # Re-adding gives a book the newest seq, so the last block keeps
+        # growing and splitting while the old blocks empty and are deleted
+        def churn():
+            try:
+                while not done.is_set():
+                    for i, isbn in enumerate(extra_isbns):
+                        library.remove_book(isbn)
+                        library.add_book(Book(f"Extra {i}", "Extra", isbn))
+                        latest[0] = i
+            except Exception as e:
+                errors.append(e)
+
+        workers = [threading.Thread(target=worker, args=(borrowed[t], returned[t], t))
+                   for t in range(threads)]
+        churner = threading.Thread(target=churn)
+        # Switch threads far more often than the default 5 ms, so borrows
+        # land in the middle of block splits
+        switch_interval = sys.getswitchinterval()
+        sys.setswitchinterval(1e-5)
+        start = time.perf_counter()
+        churner.start()
+        for thread in workers:
+            thread.start()
+        for thread in workers:
+            thread.join()
+        elapsed = time.perf_counter() - start
+        done.set()
+        churner.join()
+        sys.setswitchinterval(switch_interval)
+        assert not errors, f"{len(errors)} threads failed: {errors[0]!r}"
+
+        for i, isbn in enumerate(isbns):
+            balance = sum(b[i] for b in borrowed) - sum(r[i] for r in returned)
+            assert balance == library.get_book(isbn).is_borrowed, f"inconsistent state for {isbn}"
+        listing = library.listing
+        for i, block in enumerate(listing.blocks):
+            assert listing.borrowed[i] == sum(book.is_borrowed for book in block), \
+                f"block {i} counts {listing.borrowed[i]} borrowed books"
+        print(f"{threads:>3} threads: {threads * ops_per_thread / elapsed:>12,.0f} ops/s - consistent")
+        threads *= 2
+
+
+# Per-operation cost of journaled changes, then the time to recover the
+# library from its snapshot and log tail
+def benchmark_journal(operations=1_000_000, snapshot_every=100_000, books=100_000):
+    with tempfile.TemporaryDirectory() as folder:
+        library = Library.open(folder, snapshot_every, verbose=False)
+        start = time.perf_counter()
+        library.add_books(Book(f"Title {i}", f"Author {i % 1000}", str(1_000_000_000 + i))
+                          for i in range(books))
+        rng = random.Random(0)
+        for _ in range(operations - books):
+            isbn = str(1_000_000_000 + rng.randrange(books))
+            if not library.borrow_book(isbn):
+                library.return_book(isbn)
+        elapsed = time.perf_counter() - start
+        library.close()
+        log_size = os.path.getsize(os.path.join(folder, "library.log"))
+        print(f"{operations:,} operations: {elapsed / operations * 1e6:.2f} us/op, "
+              f"log tail {log_size / 1e6:.1f} MB")
+
+        start = time.perf_counter()
+        recovered = Library.open(folder, snapshot_every, verbose=False)
+        elapsed = time.perf_counter() - start
+        recovered.close()
+        borrowed = sum(book.is_borrowed for book in recovered.books.values())
+        assert borrowed == sum(book.is_borrowed for book in library.books.values())
+        print(f"recovered {len(recovered.books):,} books ({borrowed:,} borrowed) in {elapsed:.2f}s")
+
+
+# Time to fetch and render one page of 20 books, with and without filters
+def benchmark_pages(n=1_000_000, pages=1_000):
+    library = build_library(n, verbose=False)
+    for i in range(0, n, 2):
+        library.borrow_book(str(1_000_000_000 + i))
+    stdout = sys.stdout
+    # Cursor of the page that starts halfway through the catalog
+    middle = library.get_book(str(1_000_000_000 + n // 2)).seq
+    for label, filters in (("all books", {}), ("available", {"status": "available"}),
+                           ("by author", {"author": "Author 7"}),
+                           ("halfway", {"cursor": middle}),
+                           ("halfway, available", {"cursor": middle, "status": "available"})):
+        sys.stdout = io.StringIO()
+        start = time.perf_counter()
+        for _ in range(pages):
+            library.display_books(**filters)
+        elapsed = time.perf_counter() - start
+        sys.stdout = stdout
+        print(f"{label:>18}: {elapsed / pages * 1e6:.1f} us/page")
+
+
+if __name__ == "__main__":
+    benchmarks = {
+        "lookups": benchmark_lookups,
+        "bulk_load": benchmark_bulk_load,
+        "memory": benchmark_memory,
+        "stress": benchmark_stress,
+        "journal": benchmark_journal,
+        "pages": benchmark_pages,
+    }
+    name = sys.argv[1] if len(sys.argv) > 1 else "lookups"
+    args = [int(arg) for arg in sys.argv[2:]]
+    benchmarks[name](*args)
@@ -0,0 +1,108 @@
+# =============================================================
+# LOAD GENERATOR FOR project_server.py
+# =============================================================
+# Opens many concurrent client connections, sends random borrow/return
+# requests and reports latency percentiles and throughput.
+#
+# Start the server first, then run from this folder:
+#   python project_server.py --books 100000
+#   python project_load_test.py --clients 1000 --requests 100
+#
+# --check starts a server in this process and checks its responses instead,
+# including malformed lines in the middle of a batch:
+#   python project_load_test.py --check
+
+import argparse
+import asyncio
+import json
+import random
+import time
+
+from project import Book, Library
+from project_server import LibraryServer
+
+
+async def client(host, port, requests, books, latencies):
+    reader, writer = await asyncio.open_connection(host, port)
+    rng = random.Random()
+    for i in range(requests):
+        op = "borrow" if rng.random() < 0.5 else "return"
+        isbn = str(2_000_000_000 + rng.randrange(books))
+        start = time.perf_counter()
+        writer.write(json.dumps({"id": i, "op": op, "isbn": isbn}).encode() + b"\n")
+        await writer.drain()
+        await reader.readline()
+        latencies.append(time.perf_counter() - start)
+    writer.close()
+    await writer.wait_closed()
+
+
+def percentile(sorted_values, p):
+    index = min(len(sorted_values) - 1, int(len(sorted_values) * p / 100))
+    return sorted_values[index]
+
+
+# Send `lines` in one write and read one response per line
+async def send_batch(host, port, lines):
+    reader, writer = await asyncio.open_connection(host, port)
+    writer.write(b"".join(line + b"\n" for line in lines))
+    await writer.drain()
+    responses = [json.loads(await reader.readline()) for _ in lines]
+    writer.close()
+    await writer.wait_closed()
+    return responses
+
+
+async def check(host):
+    library = Library(verbose=False)
+    library.add_book(Book("1984", "George Orwell", "1234567891"))
+    tcp_server = await asyncio.start_server(LibraryServer(library).handle_client, host, 0)
+    port = tcp_server.sockets[0].getsockname()[1]
+    async with tcp_server:
+        responses = await send_batch(host, port, [
+            b'{"id": 1, "op": "borrow", "isbn": "1234567891"}',
+            b'[1, 2]',
+            b'"x"',
+            b'{not json',
+            b'{"id": 2, "op": "borrow"}',
+            b'{"id": 3, "op": "display", "limit": "many"}',
+            b'{"id": 4, "op": "fly"}',
+            b'{"id": 5, "op": "return", "isbn": "1234567891"}',
+        ])
+    assert responses[0] == {"id": 1, "ok": True}
+    assert responses[1] == responses[2] == {"ok": False, "error": "request must be a JSON object"}
+    assert all(response["ok"] is False for response in responses[3:7])
+    assert responses[7] == {"id": 5, "ok": True}
+    assert not library.books["1234567891"].is_borrowed
+    print("all checks passed")
+
+
+async def main():
+    parser = argparse.ArgumentParser(description="Load test the Library server.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--clients", type=int, default=1000)
+    parser.add_argument("--requests", type=int, default=100, help="requests per client")
+    parser.add_argument("--books", type=int, default=100_000, help="books loaded in the server")
+    parser.add_argument("--check", action="store_true", help="check the server's responses in-process")
+    args = parser.parse_args()
+
+    if args.check:
+        await check(args.host)
+        return
+
+    latencies = []
+    start = time.perf_counter()
+    await asyncio.gather(*(client(args.host, args.port, args.requests, args.books, latencies)
+                           for _ in range(args.clients)))
+    elapsed = time.perf_counter() - start
+
+    latencies.sort()
+    print(f"{len(latencies):,} requests from {args.clients:,} clients in {elapsed:.2f}s "
+          f"({len(latencies) / elapsed:,.0f} req/s)")
+    print(f"p50: {percentile(latencies, 50) * 1000:.2f} ms")
+    print(f"p99: {percentile(latencies, 99) * 1000:.2f} ms")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
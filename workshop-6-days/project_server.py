@@ -0,0 +1,138 @@
+# =============================================================
+# ASYNC NETWORK FRONT-END FOR THE LIBRARY MANAGEMENT SYSTEM
+# =============================================================
+# Serves the Library from project.py to many clients at once over a local TCP
+# socket. The protocol is JSON Lines: each request is one JSON object per line
+# and each response is one JSON object per line, in the same order.
+#
+#   {"id": 1, "op": "borrow", "isbn": "1234567890"}
+#   {"id": 1, "ok": true}
+#
+# Supported ops: display, borrow, return, add, remove. "display" returns one
+# page and takes optional "limit", "cursor", "status" and "author" fields.
+#
+# Run from this folder:
+#   python project_server.py [--port 8765] [--books 100000]
+
+import argparse
+import asyncio
+import json
+
+from project import Book, Library
+
+MAX_LINE = 64 * 1024        # Longest request line we accept
+READ_SIZE = 64 * 1024       # Bytes read from a client in one go
+DISPLAY_LIMIT = 100         # Default number of books returned by "display"
+
+
+def book_to_dict(book):
+    return {"title": book.title, "author": book.author,
+            "isbn": book.isbn, "is_borrowed": book.is_borrowed}
+
+
+# Run one request against the library and build its response
+def handle_request(library, request):
+    if not isinstance(request, dict):
+        return {"ok": False, "error": "request must be a JSON object"}
+    op = request.get("op")
+    response = {"id": request.get("id")}
+    if op == "display":
+        try:
+            books, next_cursor = library.page(int(request.get("limit", DISPLAY_LIMIT)),
+                                              int(request.get("cursor", 0)),
+                                              request.get("status"), request.get("author"))
+        except ValueError as e:
+            response["ok"] = False
+            response["error"] = str(e)
+            return response
+        response["ok"] = True
+        response["books"] = [book_to_dict(book) for book in books]
+        response["next_cursor"] = next_cursor
+    elif op == "borrow":
+        response["ok"] = library.borrow_book(request["isbn"])
+    elif op == "return":
+        response["ok"] = library.return_book(request["isbn"])
+    elif op == "add":
+        response["ok"] = library.add_book(Book(request["title"], request["author"], request["isbn"]))
+    elif op == "remove":
+        response["ok"] = library.remove_book(request["isbn"])
+    else:
+        response["ok"] = False
+        response["error"] = f"unknown op: {op!r}"
+    return response
+
+
+class LibraryServer:
+    def __init__(self, library, max_clients=10_000):
+        self.library = library
+        # Clients beyond this limit wait for a free slot instead of being served
+        self.slots = asyncio.Semaphore(max_clients)
+
+    async def handle_client(self, reader, writer):
+        async with self.slots:
+            try:
+                await self.serve(reader, writer)
+            except (ConnectionResetError, BrokenPipeError):
+                pass
+            finally:
+                writer.close()
+
+    async def serve(self, reader, writer):
+        pending = b""
+        while True:
+            data = await reader.read(READ_SIZE)
+            if not data:
+                break
+            lines = (pending + data).split(b"\n")
+            pending = lines.pop()
+            if len(pending) > MAX_LINE:
+                writer.write(b'{"ok": false, "error": "request too long"}\n')
+                break
+
+            # Batching: answer every request that arrived in this read with a
+            # single write. A bad line only fails its own response, never the
+            # rest of the batch.
+            responses = []
+            for line in lines:
+                if not line.strip():
+                    continue
+                try:
+                    response = handle_request(self.library, json.loads(line))
+                except (ValueError, KeyError, TypeError, AttributeError) as e:
+                    response = {"ok": False, "error": str(e)}
+                responses.append(json.dumps(response))
+            if responses:
+                writer.write(("\n".join(responses) + "\n").encode())
+                # Backpressure: stop reading from a client that isn't
+                # reading its responses
+                await writer.drain()
+        await writer.drain()
+
+
+async def main():
+    parser = argparse.ArgumentParser(description="Serve a Library over JSON Lines.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--books", type=int, default=0, help="number of sample books to load")
+    parser.add_argument("--max-clients", type=int, default=10_000)
+    args = parser.parse_args()
+
+    library = Library(verbose=False)
+    library.add_book(Book("The Great Gatsby", "F. Scott Fitzgerald", "1234567890"))
+    library.add_book(Book("1984", "George Orwell", "1234567891"))
+    library.add_books(Book(f"Title {i}", f"Author {i % 1000}", str(2_000_000_000 + i))
+                      for i in range(args.books))
+
+    server = LibraryServer(library, args.max_clients)
+    tcp_server = await asyncio.start_server(server.handle_client, args.host, args.port,
+                                            backlog=args.max_clients)
+    print(f"Serving {len(library.books):,} books on {args.host}:{args.port}")
+    async with tcp_server:
+        await tcp_server.serve_forever()
+
+
+if __name__ == "__main__":
+    try:
+        asyncio.run(main())
+    except KeyboardInterrupt:
+        pass
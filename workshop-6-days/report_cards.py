@@ -0,0 +1,113 @@
+# =============================================================
+# REPORT CARDS FOR A WHOLE CLASS AT ONCE
+# =============================================================
+# Batch version of the report card at the top of day-2.py. Instead of one
+# nested dict per student, marks are stored column by column: one array per
+# subject, holding that subject's marks for every student. Totals,
+# percentages, pass/fail and ranks are then computed for all students with a
+# few whole-array operations.
+#
+# NumPy is used when it is installed; otherwise the same steps run on
+# array.array columns using map() and Counter, which loop in C.
+#
+# Run from this folder to time a large batch:
+#   python report_cards.py [students]
+
+import operator
+import os
+import random
+import sys
+import time
+from array import array
+from collections import Counter
+from itertools import repeat
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+SUBJECTS = ('maths', 'science', 'english')
+PASS_PERCENTAGE = 40
+
+
+# marks: {subject: sequence of marks, one per student}, each subject out of 100.
+# Returns totals, percentages, passed flags and ranks (1 = highest total;
+# students with the same total share a rank).
+def compute_results(marks):
+    columns = list(marks.values())
+    if np is not None:
+        columns = [np.asarray(column) for column in columns]
+        totals = np.sum(columns, axis=0)
+        percentages = totals / len(columns)
+        passed = percentages >= PASS_PERCENTAGE
+        # Rank = 1 + number of students with a strictly higher total
+        ascending = np.sort(totals)
+        ranks = len(totals) - np.searchsorted(ascending, totals, side='right') + 1
+        return totals, percentages, passed, ranks
+
+    totals = array('l', columns[0])
+    for column in columns[1:]:
+        totals = array('l', map(operator.add, totals, column))
+    count = len(columns)
+    percentages = array('d', map(operator.truediv, totals, repeat(count)))
+    passed = bytearray(map((PASS_PERCENTAGE * count).__le__, totals))
+    # Totals are whole numbers in a small range, so rank with a counting table
+    # instead of sorting: rank_of[t] = 1 + number of students above total t
+    students_with = Counter(totals)
+    rank_of = {}
+    above = 0
+    for total in sorted(students_with, reverse=True):
+        rank_of[total] = above + 1
+        above += students_with[total]
+    ranks = array('l', map(rank_of.__getitem__, totals))
+    return totals, percentages, passed, ranks
+
+
+CARD = '''----------------REPORT CARD----------------
+Name: {}
+Roll No: {}
+%s
+Total Marks: {}
+Percentage: {:.2f}
+Result: {}
+Rank: {}
+-------------------------------------------
+'''
+
+
+# Format the report cards and write them to `file` in chunks, one write per
+# chunk, so the whole text never has to be built in memory
+def write_report_cards(file, names, rollnos, marks, chunk_size=10_000):
+    totals, percentages, passed, ranks = compute_results(marks)
+    # One format string with a slot per subject, filled by map() for a whole chunk
+    card = CARD % ''.join(f'{subject.title()}: {{}}\n' for subject in marks)
+    results = ['Passed' if flag else 'Failed' for flag in passed]
+    columns = (names, rollnos, *marks.values(), totals, percentages, results, ranks)
+    for start in range(0, len(names), chunk_size):
+        chunk = [column[start:start + chunk_size] for column in columns]
+        file.write(''.join(map(card.format, *chunk)))
+
+
+def benchmark(n=1_000_000):
+    rng = random.Random(0)
+    marks = {subject: array('l', (rng.randrange(101) for _ in range(n))) for subject in SUBJECTS}
+    if np is not None:
+        marks = {subject: np.asarray(column) for subject, column in marks.items()}
+    backend = 'numpy' if np is not None else 'array'
+
+    start = time.perf_counter()
+    totals, percentages, passed, ranks = compute_results(marks)
+    elapsed = time.perf_counter() - start
+    print(f'{n:,} students ({backend}): results computed in {elapsed:.3f}s')
+
+    names = [f'Student {i}' for i in range(n)]
+    with open(os.devnull, 'w') as file:
+        start = time.perf_counter()
+        write_report_cards(file, names, range(1, n + 1), marks)
+        elapsed = time.perf_counter() - start
+    print(f'{n:,} report cards formatted and written in {elapsed:.3f}s')
+
+
+if __name__ == '__main__':
+    benchmark(*(int(arg) for arg in sys.argv[1:]))
@@ -0,0 +1,128 @@
+# =============================================================
+# SCHEMA-AWARE ENCODING FOR STUDENT RECORDS
+# =============================================================
+# Every student in day-4.py has the same four fields, so there is no need to
+# write the field names again for every record. Three formats:
+#
+#   json     {"name": "Ram", "age": 20, "roll": 1, "marks": 80}   (students.json)
+#   compact  ["Ram", 20, 1, 80]                                  (positional JSON)
+#   binary   roll, age, marks and the name length packed with struct, then the name
+#
+# Each codec encodes/decodes single records (used by StudentStore) and whole
+# files (dump_students / load_students).
+#
+# Run from this folder to compare the formats:
+#   python student_codec.py [students]
+
+import io
+import json
+import struct
+import sys
+import time
+
+FIELDS = ('name', 'age', 'roll', 'marks')
+
+
+class JsonCodec:
+    name = 'json'
+
+    def encode(self, student):
+        return json.dumps(student).encode()
+
+    def decode(self, payload):
+        return json.loads(payload)
+
+    def dump(self, students, file):
+        file.write(json.dumps(list(students)).encode())
+
+    def load(self, file):
+        return json.loads(file.read())
+
+
+class CompactCodec:
+    name = 'compact'
+
+    def encode(self, student):
+        return json.dumps([student['name'], student['age'], student['roll'], student['marks']]).encode()
+
+    def decode(self, payload):
+        return dict(zip(FIELDS, json.loads(payload)))
+
+    def dump(self, students, file):
+        rows = [[s['name'], s['age'], s['roll'], s['marks']] for s in students]
+        file.write(json.dumps(rows).encode())
+
+    def load(self, file):
+        return [{'name': name, 'age': age, 'roll': roll, 'marks': marks}
+                for name, age, roll, marks in json.loads(file.read())]
+
+
+class BinaryCodec:
+    name = 'binary'
+    # roll (8 bytes), age (4), marks (4), length of the UTF-8 name (2)
+    RECORD = struct.Struct('<qiiH')
+
+    def encode(self, student):
+        name = student['name'].encode()
+        return self.RECORD.pack(student['roll'], student['age'], student['marks'], len(name)) + name
+
+    def decode(self, payload):
+        roll, age, marks, length = self.RECORD.unpack_from(payload)
+        name = bytes(payload[self.RECORD.size:self.RECORD.size + length]).decode()
+        return {'name': name, 'age': age, 'roll': roll, 'marks': marks}
+
+    def dump(self, students, file):
+        file.write(b''.join(self.encode(student) for student in students))
+
+    def load(self, file):
+        data = file.read()
+        unpack_from, size = self.RECORD.unpack_from, self.RECORD.size
+        students = []
+        position = 0
+        while position < len(data):
+            roll, age, marks, length = unpack_from(data, position)
+            name = data[position + size:position + size + length].decode()
+            students.append({'name': name, 'age': age, 'roll': roll, 'marks': marks})
+            position += size + length
+        return students
+
+
+CODECS = {codec.name: codec for codec in (JsonCodec(), CompactCodec(), BinaryCodec())}
+
+
+# Write / read a whole list of students in the chosen format
+def dump_students(students, path='students.json', format='json'):
+    with open(path, 'wb') as file:
+        CODECS[format].dump(students, file)
+
+
+def load_students(path='students.json', format='json'):
+    try:
+        with open(path, 'rb') as file:
+            return CODECS[format].load(file)
+    except FileNotFoundError:
+        return []
+
+
+# Compare encode/decode speed and size of every format
+def benchmark(n=1_000_000):
+    students = [{'name': f'Student {i}', 'age': 15 + i % 10, 'roll': i, 'marks': i % 101}
+                for i in range(n)]
+    print(f"{'format':>8} {'dump rec/s':>12} {'load rec/s':>12} {'bytes':>12}")
+    for codec in CODECS.values():
+        buffer = io.BytesIO()
+        start = time.perf_counter()
+        codec.dump(students, buffer)
+        dumped = time.perf_counter() - start
+        size = buffer.tell()
+
+        buffer.seek(0)
+        start = time.perf_counter()
+        loaded = codec.load(buffer)
+        elapsed = time.perf_counter() - start
+        assert loaded == students
+        print(f"{codec.name:>8} {n / dumped:>12,.0f} {n / elapsed:>12,.0f} {size:>12,}")
+
+
+if __name__ == '__main__':
+    benchmark(*(int(arg) for arg in sys.argv[1:]))
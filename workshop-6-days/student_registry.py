@@ -0,0 +1,103 @@
+# =============================================================
+# INDEXED STUDENT REGISTRY
+# =============================================================
+# Used by the student management system in day-4.py. Students are the same
+# dicts as before ({'name', 'age', 'roll', 'marks'}), but instead of living in
+# a list that is searched one by one they are kept in two hash indexes:
+#   by_roll: roll -> student            (roll is the primary key)
+#   by_name: name -> {roll: student}    (several students may share a name)
+# so search, update and delete are O(1) no matter how many students there are.
+#
+# With a StudentStore (student_storage.py) the registry starts empty and reads
+# students from disk the first time they are looked up. The store only knows
+# roll numbers, so the first search by name loads every student once to fill
+# by_name. It remembers which roll numbers changed in `dirty`, so a save only
+# writes those.
+
+
+class StudentRegistry:
+    def __init__(self, students=(), store=None):
+        self.by_roll = {}
+        self.by_name = {}
+        self.store = store
+        self.names_loaded = store is None # by_name holds every student
+        self.dirty = set()
+        for student in students:
+            self.add(student)
+
+    def __len__(self):
+        return len(self.by_roll)
+
+    # Iterates over the students in memory (with a store: the ones loaded so far)
+    def __iter__(self):
+        return iter(self.by_roll.values())
+
+    def __contains__(self, roll):
+        return self.search(roll) is not None
+
+    # Returns False if a student with the same roll number already exists
+    def add(self, student):
+        if student['roll'] in self:
+            return False
+        self._index(student)
+        self.dirty.add(student['roll'])
+        return True
+
+    def search(self, roll):
+        student = self.by_roll.get(roll)
+        # A dirty roll missing from memory was deleted and must not be reloaded
+        if student is None and self.store is not None and roll not in self.dirty and roll in self.store:
+            student = self.store.get(roll)
+            self._index(student)
+        return student
+
+    def search_by_name(self, name):
+        if not self.names_loaded:
+            self.load_all()
+        return list(self.by_name.get(name, {}).values())
+
+    # Read every student of the store that isn't in memory yet
+    def load_all(self):
+        if self.store is not None:
+            for roll in self.store.rolls():
+                self.search(roll)
+        self.names_loaded = True
+
+    # Change some fields of a student, e.g. update(7, {'age': 21, 'roll': 8}).
+    # Both indexes follow when the roll number or the name changes.
+    # Returns False if the student is missing or the new roll is taken.
+    def update(self, roll, changes):
+        student = self.search(roll)
+        if student is None:
+            return False
+        new_roll = changes.get('roll', roll)
+        if new_roll != roll and new_roll in self:
+            return False
+        self._unindex(student)
+        student.update(changes)
+        self._index(student)
+        self.dirty.update((roll, new_roll))
+        return True
+
+    # Returns the removed student, or None if there was no such roll number
+    def delete(self, roll):
+        student = self.search(roll)
+        if student is not None:
+            self._unindex(student)
+            self.dirty.add(roll)
+        return student
+
+    def _index(self, student):
+        self.by_roll[student['roll']] = student
+        self.by_name.setdefault(student['name'], {})[student['roll']] = student
+
+    def _unindex(self, student):
+        del self.by_roll[student['roll']]
+        same_name = self.by_name[student['name']]
+        del same_name[student['roll']]
+        if not same_name:
+            del self.by_name[student['name']]
+
+    # Plain list of the student dicts, e.g. for json.dump
+    def to_list(self):
+        return list(self.by_roll.values())
@@ -0,0 +1,167 @@
+# =============================================================
+# INCREMENTAL, CRASH-SAFE STORAGE FOR STUDENT RECORDS
+# =============================================================
+# Replaces rewriting the whole students.json on every save. Records are kept
+# in an append-only file:
+#
+#   [op][roll][length][payload]   op: P = put, D = delete, C = commit,
+#                                     F = format (first record, names the codec)
+#
+# save() appends only the students that changed since the last save and then
+# a commit marker, and fsyncs once. When the file is opened, changes after the
+# last commit marker are ignored and cut off. So a crash in the middle of a
+# save loses that save and nothing else.
+#
+# Opening the file only reads the record headers to build an index
+# roll -> position of the latest record. A student is read and decoded when
+# it is first asked for. Payloads are encoded with one of the codecs in
+# student_codec.py; a file keeps the format it was created with.
+
+import mmap
+import os
+import struct
+
+from student_codec import CODECS
+
+HEADER = struct.Struct('<cqI') # op, roll number, payload length
+PUT, DELETE, COMMIT, FORMAT = b'P', b'D', b'C', b'F'
+
+
+class StudentStore:
+    def __init__(self, path='students.db', format='json', compact_ratio=2.0):
+        self.path = path
+        self.codec = CODECS[format]
+        # Rewrite the file once stale records take up this many times the
+        # space of the live ones
+        self.compact_ratio = compact_ratio
+        self.offsets = {} # roll -> (payload offset, payload length)
+        self.live_bytes = 0
+        self.stale_bytes = 0
+        self._scan()
+        self._file = open(self.path, 'r+b')
+        self._file.seek(0, os.SEEK_END)
+        if self._file.tell() == 0:
+            self._file.write(self._format_record())
+            self._file.flush()
+
+    def __contains__(self, roll):
+        return roll in self.offsets
+
+    def __len__(self):
+        return len(self.offsets)
+
+    def rolls(self):
+        return self.offsets.keys()
+
+    def _format_record(self):
+        name = self.codec.name.encode()
+        return HEADER.pack(FORMAT, 0, len(name)) + name + HEADER.pack(COMMIT, 0, 0)
+
+    # Build the index from the record headers, keeping only committed changes
+    def _scan(self):
+        if not os.path.exists(self.path):
+            open(self.path, 'wb').close()
+        committed_end = 0
+        with open(self.path, 'rb') as file:
+            size = os.fstat(file.fileno()).st_size
+            if size:
+                with mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as data:
+                    pending = {}
+                    position = 0
+                    while position + HEADER.size <= size:
+                        op, roll, length = HEADER.unpack_from(data, position)
+                        payload = position + HEADER.size
+                        if payload + length > size:
+                            break # Half-written record at the end of the file
+                        if op == FORMAT:
+                            self.codec = CODECS[data[payload:payload + length].decode()]
+                        elif op == COMMIT:
+                            self._apply(pending)
+                            pending = {}
+                            committed_end = payload
+                        else:
+                            pending[roll] = (payload, length) if op == PUT else None
+                        position = payload + length
+        # Drop whatever was written after the last commit
+        os.truncate(self.path, committed_end)
+
+    def _apply(self, changes):
+        for roll, location in changes.items():
+            old = self.offsets.pop(roll, None)
+            if old is not None:
+                self.live_bytes -= old[1]
+                self.stale_bytes += old[1]
+            if location is not None:
+                self.offsets[roll] = location
+                self.live_bytes += location[1]
+
+    # Read one student from disk
+    def get(self, roll):
+        location = self.offsets.get(roll)
+        if location is None:
+            return None
+        offset, length = location
+        self._file.seek(offset)
+        payload = self._file.read(length)
+        self._file.seek(0, os.SEEK_END)
+        return self.codec.decode(payload)
+
+    # Write the students the registry marked as changed, then commit
+    def save(self, registry):
+        if not registry.dirty:
+            return 0
+        chunks = []
+        changes = {}
+        position = self._file.tell()
+        for roll in registry.dirty:
+            student = registry.by_roll.get(roll)
+            if student is None:
+                if roll not in self.offsets:
+                    continue # Added and deleted again before it was ever saved
+                chunks.append(HEADER.pack(DELETE, roll, 0))
+                changes[roll] = None
+                position += HEADER.size
+            else:
+                payload = self.codec.encode(student)
+                chunks.append(HEADER.pack(PUT, roll, len(payload)))
+                chunks.append(payload)
+                changes[roll] = (position + HEADER.size, len(payload))
+                position += HEADER.size + len(payload)
+        chunks.append(HEADER.pack(COMMIT, 0, 0))
+
+        self._file.write(b''.join(chunks))
+        self._file.flush()
+        os.fsync(self._file.fileno())
+        self._apply(changes)
+        saved = len(registry.dirty)
+        registry.dirty.clear()
+
+        if self.stale_bytes > self.compact_ratio * max(self.live_bytes, 1):
+            self.compact()
+        return saved
+
+    # Copy only the live records to a new file and atomically swap it in
+    def compact(self):
+        temp_path = self.path + '.tmp'
+        offsets = {}
+        with open(temp_path, 'wb') as out:
+            out.write(self._format_record())
+            position = out.tell()
+            for roll, (offset, length) in self.offsets.items():
+                self._file.seek(offset)
+                out.write(HEADER.pack(PUT, roll, length))
+                out.write(self._file.read(length))
+                offsets[roll] = (position + HEADER.size, length)
+                position += HEADER.size + length
+            out.write(HEADER.pack(COMMIT, 0, 0))
+            out.flush()
+            os.fsync(out.fileno())
+        self._file.close()
+        os.replace(temp_path, self.path)
+        self.offsets = offsets
+        self.stale_bytes = 0
+        self._file = open(self.path, 'r+b')
+        self._file.seek(0, os.SEEK_END)
+
+    def close(self):
+        self._file.close()